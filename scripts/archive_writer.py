@@ -0,0 +1,108 @@
+import io
+import shutil
+import tarfile
+import time
+import zipfile
+
+# 文件名后缀 -> 归档模式, 按顺序匹配 (长后缀在前)
+ARCHIVE_FORMATS = {
+    '.tar.gz': 'w:gz',
+    '.tgz': 'w:gz',
+    '.tar': 'w',
+    '.zip': 'zip',
+}
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def archive_mode(path):
+    lower = path.lower()
+    for suffix, mode in ARCHIVE_FORMATS.items():
+        if lower.endswith(suffix):
+            return mode
+    return None
+
+
+class _StreamOutput:
+    """只提供 write 的输出文件: zipfile 无法 seek 时改用数据描述符记录大小和 CRC, 不回写本地文件头。"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ArchiveWriter:
+    """按顺序把输出写成单个 .tar / .tar.gz / .zip 归档, 成员名为 / 分隔的相对路径。
+
+    只追加写入, 不回写也不随机访问, 适合网络盘和管道。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mode = archive_mode(path)
+        if self.mode is None:
+            raise ValueError(f"不支持的归档格式: {path} (支持 {', '.join(ARCHIVE_FORMATS)})")
+        self.mtime = time.time()
+        self.output = None
+        if self.mode == 'zip':
+            self.output = _StreamOutput(path)
+            self.archive = zipfile.ZipFile(self.output, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(path, self.mode, format=tarfile.PAX_FORMAT)
+        self.members = 0
+        self.bytes_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _tar_info(self, name, size, is_dir=False):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = self.mtime
+        if is_dir:
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+        else:
+            info.mode = 0o644
+        return info
+
+    def add_dir(self, name):
+        name = name.rstrip('/') + '/'
+        if self.mode == 'zip':
+            self.archive.writestr(name, b'')
+        else:
+            self.archive.addfile(self._tar_info(name, 0, is_dir=True))
+
+    def add_bytes(self, name, data):
+        if self.mode == 'zip':
+            self.archive.writestr(name, data)
+        else:
+            self.archive.addfile(self._tar_info(name, len(data)), io.BytesIO(data))
+        self.members += 1
+        self.bytes_written += len(data)
+
+    def add_file(self, name, fileobj, size):
+        # fileobj 需位于开头; 按块拷贝, 不把整个成员读入内存
+        if self.mode == 'zip':
+            with self.archive.open(name, 'w', force_zip64=True) as dst:
+                shutil.copyfileobj(fileobj, dst, COPY_CHUNK_SIZE)
+        else:
+            self.archive.addfile(self._tar_info(name, size), fileobj)
+        self.members += 1
+        self.bytes_written += size
+
+    def close(self):
+        self.archive.close()
+        if self.output is not None:
+            self.output.close()
+
@@ -0,0 +1,7 @@
+"""维护脚本的性能基准: 合成 ets 源码树生成器与计时工具。
+
+用法 (在仓库根目录运行):
+    python scripts/benchmark generate --files 10000 --out /tmp/ets-10k
+    python scripts/benchmark run --sizes 1k 10k --output bench.json --baseline baseline.json
+    python scripts/benchmark compare bench.json baseline.json
+"""
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# 作为目录运行时把 scripts/ 加入模块搜索路径, 以便导入各维护脚本
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.runner import main  # noqa: E402
+
+if __name__ == '__main__':
+    main()
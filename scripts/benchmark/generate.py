@@ -0,0 +1,205 @@
+import json
+import os
+import random
+import re
+import shutil
+
+import fix_final_imports
+import fix_imports
+import fix_imports_outside_utils
+from copy_and_convert import functional_groups, group_key
+
+# 生成器格式版本, 变化后已生成的树需要重新生成
+TREE_VERSION = 1
+TREE_META = '.bench_tree.json'
+
+# 真实源码树, 用于采样目录分布和文件大小
+REAL_TREE = "entry/src/main/ets"
+
+# 没有真实源码树时使用的目录权重与文件大小 (字节)
+DEFAULT_DIRS = {
+    'utils/parser': 34, 'utils/crawler': 26, 'utils/performance': 21, 'pages': 15,
+    'network': 14, 'components': 14, 'utils/validation': 10, 'core': 10,
+    'components/capsule': 10, 'utils': 9, 'models': 9, 'utils/search': 8,
+    'utils/database': 8, 'utils/cache': 8, 'viewmodel': 7, 'utils/content': 7,
+    'utils/ui': 6, 'utils/security': 6, 'components/read': 6, 'utils/scripting': 5,
+}
+DEFAULT_SIZES = [133, 1500, 3016, 5000, 7240, 10000, 13745, 20000, 40000, 82811]
+
+# 单个目录中的文件过多时拆分到 genN 子目录
+DIR_LIMIT = 200
+# 头部中命中修复规则的 import 所占比例
+RULE_IMPORT_RATIO = 0.4
+# 资源目录中的二进制文件与 json 配置数量
+MEDIA_FILES = 4
+PROFILE_FILES = 2
+
+_PATTERN_TOKEN = re.compile(r'''\\s[+*]|\["\\'\]|\\(.)|(.)''', re.S)
+
+BODY_TEMPLATES = [
+    "\n/**\n * {name} 的第 {i} 个辅助方法\n */\nexport function {name}Helper{i}(input: string): string {{\n"
+    "  const result: string[] = [];\n  for (let k = 0; k < input.length; k++) {{\n"
+    "    result.push(input.charAt(k));\n  }}\n  return result.join('');\n}}\n",
+    "\n@ObservedV2\nexport class {name}State{i} {{\n  @Trace value: number = {i};\n"
+    "  @Trace label: string = '{name}-{i}';\n\n  update(next: number): void {{\n"
+    "    // 只在变化时触发刷新\n    if (next !== this.value) {{\n      this.value = next;\n    }}\n  }}\n}}\n",
+    "\nconst {name}_PATTERN_{i}: RegExp = /^[a-z]+\\/(\\d+)$/i;\n"
+    "const {name}_URL_{i}: string = 'https://example.com/api/v{i}/items?from=0';\n",
+]
+
+
+def sample_specifier(pattern, quote):
+    """按修复规则的正则构造一个能被它匹配的 from '...' 片段; 无法构造时返回 None。"""
+    parts = []
+    for match in _PATTERN_TOKEN.finditer(pattern):
+        token = match.group()
+        if token.startswith('\\s'):
+            parts.append(' ')
+        elif token.startswith('['):
+            parts.append(quote)
+        elif match.group(1) is not None:
+            parts.append(match.group(1))
+        else:
+            if token in '^$()|?*+{}[]':
+                return None
+            parts.append(token)
+    text = ''.join(parts)
+    if not text.endswith(quote):
+        text += 'Generated' + quote
+    return text if re.match(pattern, text) else None
+
+
+def rule_samples(fix_rules):
+    samples = []
+    for pattern, _ in fix_rules:
+        for quote in ('"', "'"):
+            text = sample_specifier(pattern, quote)
+            if text:
+                samples.append(text)
+    return samples
+
+
+def profile_tree(base_path=REAL_TREE):
+    """返回 (目录 -> 文件数, 文件大小列表), 真实源码树不存在时返回默认分布。"""
+    dirs = {}
+    sizes = []
+    for root, _, files in os.walk(base_path):
+        rel_dir = os.path.relpath(root, base_path).replace(os.sep, '/')
+        if rel_dir == '.' or '__tests__' in rel_dir:
+            continue
+        for file in files:
+            if file.endswith('.ets'):
+                dirs[rel_dir] = dirs.get(rel_dir, 0) + 1
+                sizes.append(os.path.getsize(os.path.join(root, file)))
+    if not sizes:
+        return dict(DEFAULT_DIRS), list(DEFAULT_SIZES)
+    return dirs, sorted(sizes)
+
+
+def module_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def make_header(rng, rel_dir, samples, modules):
+    lines = []
+    for _ in range(rng.randint(3, 15)):
+        if samples and rng.random() < RULE_IMPORT_RATIO:
+            spec = rng.choice(samples)
+            name = re.split(r'[/"\']', spec.strip('"\''))[-1] or 'Generated'
+            lines.append(f"import {{ {name} }} {spec};")
+        elif rng.random() < 0.2:
+            lines.append(f"import {{ {rng.choice(['common', 'http', 'util'])} }} from '@kit.{rng.choice(['AbilityKit', 'NetworkKit', 'ArkTS'])}';")
+        else:
+            target = rng.choice(modules)
+            spec = os.path.relpath(os.path.splitext(target)[0], rel_dir or '.').replace(os.sep, '/')
+            if not spec.startswith('.'):
+                spec = './' + spec
+            lines.append(f"import {{ {module_name(target)} }} from '{spec}';")
+    return '\n'.join(lines) + '\n'
+
+
+def make_body(rng, name, size):
+    parts = [f"\n@ComponentV2\nexport struct {name} {{\n  build() {{\n    Column() {{}}\n  }}\n}}\n"]
+    length = len(parts[0])
+    i = 0
+    while length < size:
+        text = rng.choice(BODY_TEMPLATES).format(name=name, i=i)
+        parts.append(text)
+        length += len(text)
+        i += 1
+    return ''.join(parts)
+
+
+def layout(rng, files, dirs):
+    """按真实目录分布为 files 个文件分配路径, 过满的目录拆分到 genN 子目录。"""
+    names = sorted(dirs)
+    weights = [dirs[name] for name in names]
+    counts = dict.fromkeys(names, 0)
+    paths = []
+    for _ in range(files):
+        rel_dir = rng.choices(names, weights)[0]
+        index = counts[rel_dir]
+        counts[rel_dir] += 1
+        shard = index // DIR_LIMIT
+        if shard:
+            rel_dir = f'{rel_dir}/gen{shard}'
+        paths.append(f'{rel_dir}/Module{index:05d}.ets')
+    return paths
+
+
+def generate_tree(out_dir, files, seed=0, base_path=REAL_TREE):
+    """在 out_dir 下生成 entry/src/main 结构的合成源码树, 返回生成信息。
+
+    ets 目录中的目录分布与文件大小按真实源码树采样, 头部 import 按比例命中
+    fix_imports / fix_imports_outside_utils / fix_final_imports 的规则表;
+    另外补齐 functional_groups 中列出的文件, 以及少量二进制资源和 json 配置。
+    """
+    meta_path = os.path.join(out_dir, TREE_META)
+    meta = {'version': TREE_VERSION, 'files': files, 'seed': seed}
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == meta:
+                return meta
+    except (OSError, ValueError):
+        pass
+
+    # 参数不同的旧树整体删除, 避免残留文件影响计时
+    shutil.rmtree(os.path.join(out_dir, 'entry'), ignore_errors=True)
+    rng = random.Random(seed)
+    dirs, sizes = profile_tree(base_path)
+    main_dir = os.path.join(out_dir, 'entry', 'src', 'main')
+    ets_dir = os.path.join(main_dir, 'ets')
+
+    paths = layout(rng, files, dirs)
+    # functional_groups 中的文件替换掉同等数量的随机文件, 保证分类提取有内容
+    group_files = sorted({group_key(relative_file) for file_list in functional_groups.values()
+                          for relative_file in file_list})
+    group_files = [path[len('ets/'):] for path in group_files if path.startswith('ets/')]
+    paths = group_files[:files] + paths[:max(files - len(group_files), 0)]
+
+    utils_samples = rule_samples(fix_imports.fix_rules) + rule_samples(fix_final_imports.fix_rules)
+    outside_samples = rule_samples(fix_imports_outside_utils.fix_rules)
+    for path in paths:
+        rel_dir = os.path.dirname(path)
+        samples = utils_samples if path.startswith('utils/') else outside_samples
+        header = make_header(rng, rel_dir, samples, paths)
+        body = make_body(rng, module_name(path).replace('.', '_'), max(rng.choice(sizes) - len(header), 0))
+        file_path = os.path.join(ets_dir, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(header + body)
+
+    media_dir = os.path.join(main_dir, 'resources', 'base', 'media')
+    profile_dir = os.path.join(main_dir, 'resources', 'base', 'profile')
+    os.makedirs(media_dir, exist_ok=True)
+    os.makedirs(profile_dir, exist_ok=True)
+    for i in range(MEDIA_FILES):
+        with open(os.path.join(media_dir, f'icon{i}.png'), 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n' + rng.randbytes(rng.choice(sizes)))
+    for i in range(PROFILE_FILES):
+        with open(os.path.join(profile_dir, f'profile{i}.json'), 'w', encoding='utf-8') as f:
+            json.dump({'src': [os.path.splitext(path)[0] for path in paths[i::max(files // 10, 1)]]}, f, indent=2)
+
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return meta
@@ -0,0 +1,337 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import copy_and_convert
+import fix_imports
+import fix_imports_outside_utils
+import import_fixer
+from benchmark.generate import generate_tree
+
+RESULTS_VERSION = 1
+
+# 预设规模
+SIZES = {'1k': 1000, '10k': 10000, '100k': 100000}
+DEFAULT_SIZES = ['1k', '10k']
+
+# 超过基线 (1 + tolerance) 倍且绝对差值超过 MIN_DELTA 秒才算退化, 避免小阶段的抖动误报
+DEFAULT_TOLERANCE = 0.15
+MIN_DELTA = 0.05
+
+# 旧流程的阶段以脚本输出中的提示行划分
+CONVERT_MARKERS = [
+    ("所有文件复制完成！", 'copy'),
+    ("所有文件转换完成！", 'convert'),
+    ("功能分类提取完成！", 'extract'),
+    ("开始合并其他文件...", 'group_merge'),
+    ("所有文件处理完成！", 'dir_merge'),
+]
+
+
+class PhaseClock:
+    """累计一次运行中各阶段的用时。
+
+    阶段可以来自被包装的函数 (调用耗时计入对应阶段), 也可以来自脚本输出中的
+    提示行 (两次提示之间的耗时计入后一个提示对应的阶段); 运行期间的标准输出
+    写入本对象后被丢弃。
+    """
+
+    def __init__(self, markers=None):
+        self.markers = markers or []
+        self.phases = {}
+        self._patches = []
+        self._last = time.perf_counter()
+
+    def add(self, phase, elapsed):
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+    def patch(self, owner, attr, value):
+        self._patches.append((owner, attr, getattr(owner, attr)))
+        setattr(owner, attr, value)
+
+    def wrap(self, owner, attr, phase):
+        original = getattr(owner, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - start)
+
+        self.patch(owner, attr, timed)
+
+    def restore(self):
+        while self._patches:
+            owner, attr, original = self._patches.pop()
+            setattr(owner, attr, original)
+
+    def write(self, text):
+        for marker, phase in self.markers:
+            if marker in text:
+                now = time.perf_counter()
+                self.add(phase, now - self._last)
+                self._last = now
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def run_main(module, argv, clock):
+    # 以命令行方式调用脚本的 main(), 返回总用时; 各阶段用时记录在 clock 中
+    saved_argv = sys.argv
+    sys.argv = [module.__name__ + '.py'] + argv
+    try:
+        with contextlib.redirect_stdout(clock):
+            start = time.perf_counter()
+            clock._last = start
+            module.main()
+            return time.perf_counter() - start
+    finally:
+        sys.argv = saved_argv
+        clock.restore()
+
+
+def fixer_case(module, warm):
+    def run(work_dir, jobs):
+        manifest_path = os.path.join(work_dir, '.import_fix_manifest.json')
+
+        class BenchManifest(import_fixer.Manifest):
+            # 清单写在工作目录中, 不影响仓库里的真实清单
+            def __init__(self, path=manifest_path):
+                super().__init__(path)
+
+        argv = ['--jobs', str(jobs)]
+        if warm:
+            # 先完整运行一次生成清单, 计时的是清单命中后的增量运行
+            clock = PhaseClock()
+            clock.patch(import_fixer, 'Manifest', BenchManifest)
+            run_main(module, argv + ['--full'], clock)
+        else:
+            argv.append('--full')
+
+        clock = PhaseClock()
+        clock.patch(import_fixer, 'Manifest', BenchManifest)
+        clock.wrap(import_fixer, 'collect_files', 'walk')
+        clock.wrap(import_fixer, 'RuleEngine', 'compile')
+        clock.wrap(BenchManifest, '__init__', 'manifest')
+        clock.wrap(BenchManifest, 'save', 'manifest')
+        total = run_main(module, argv, clock)
+        clock.phases['fix'] = max(total - sum(clock.phases.values()), 0.0)
+        return total, clock.phases
+    return run
+
+
+def convert_case(mode):
+    def run(work_dir, jobs):
+        output_dir = os.path.join(work_dir, 'output')
+        dirs = {
+            'source_dir': os.path.join(work_dir, 'entry', 'src', 'main'),
+            'target_dir': output_dir,
+            'merged_dir': os.path.join(output_dir, 'merged'),
+        }
+
+        def clock_for(markers=None):
+            clock = PhaseClock(markers)
+            for attr, value in dirs.items():
+                clock.patch(copy_and_convert, attr, value)
+            return clock
+
+        if mode == 'legacy':
+            clock = clock_for(CONVERT_MARKERS)
+            total = run_main(copy_and_convert, [], clock)
+        else:
+            argv = ['--incremental'] if mode == 'incremental' else ['--stream']
+            if mode == 'incremental':
+                run_main(copy_and_convert, argv, clock_for())
+            clock = clock_for()
+            clock.wrap(copy_and_convert, 'plan_dump', 'walk')
+            clock.wrap(copy_and_convert, 'plan_outputs', 'plan')
+            clock.wrap(copy_and_convert, 'load_deps', 'deps')
+            clock.wrap(copy_and_convert, 'save_deps', 'deps')
+            total = run_main(copy_and_convert, argv, clock)
+            clock.phases['write'] = max(total - sum(clock.phases.values()), 0.0)
+        return total, clock.phases
+    return run
+
+
+# 用例名 -> 运行函数; 每次运行前工作目录都会从生成的源码树重新复制
+CASES = {
+    'fix_imports/cold': fixer_case(fix_imports, warm=False),
+    'fix_imports/warm': fixer_case(fix_imports, warm=True),
+    'fix_imports_outside_utils/cold': fixer_case(fix_imports_outside_utils, warm=False),
+    'fix_imports_outside_utils/warm': fixer_case(fix_imports_outside_utils, warm=True),
+    'copy_and_convert/legacy': convert_case('legacy'),
+    'copy_and_convert/stream': convert_case('stream'),
+    'copy_and_convert/incremental': convert_case('incremental'),
+}
+
+
+def parse_size(size):
+    if size in SIZES:
+        return SIZES[size]
+    try:
+        return int(size)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的规模: {size}")
+
+
+def size_name(size):
+    parse_size(size)
+    return size
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, case_names, repeat, jobs, work_root):
+    results = {}
+    cwd = os.getcwd()
+    work_root = os.path.abspath(work_root)
+    for size in sizes:
+        files = parse_size(size)
+        tree_dir = os.path.join(work_root, f'tree-{size}')
+        work_dir = os.path.join(work_root, f'work-{size}')
+        print(f"\n生成合成源码树: {files} 个文件 -> {tree_dir}")
+        generate_tree(tree_dir, files)
+
+        cases = {}
+        for name in case_names:
+            runs = []
+            for _ in range(repeat):
+                shutil.rmtree(work_dir, ignore_errors=True)
+                shutil.copytree(os.path.join(tree_dir, 'entry'), os.path.join(work_dir, 'entry'))
+                # 修复脚本使用相对当前目录的 base_path
+                os.chdir(work_dir)
+                try:
+                    total, phases = CASES[name](work_dir, jobs)
+                finally:
+                    os.chdir(cwd)
+                runs.append({'total': total, 'phases': phases})
+            phase_names = sorted({phase for run in runs for phase in run['phases']})
+            cases[name] = {
+                'median': statistics.median(run['total'] for run in runs),
+                'min': min(run['total'] for run in runs),
+                'phases': {phase: statistics.median(run['phases'].get(phase, 0.0) for run in runs)
+                           for phase in phase_names},
+                'runs': runs,
+            }
+            print_case(size, name, cases[name])
+        shutil.rmtree(work_dir, ignore_errors=True)
+        results[size] = {'files': files, 'cases': cases}
+    return results
+
+
+def print_case(size, name, case):
+    phases = ', '.join(f"{phase} {elapsed:.3f}s" for phase, elapsed in case['phases'].items())
+    print(f"  {size:>5} {name:<32} 中位数 {case['median']:.3f}s  最快 {case['min']:.3f}s  [{phases}]")
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=MIN_DELTA):
+    """对比两份结果的中位数, 返回退化列表 [(规模, 用例, 阶段, 基线, 当前)]。"""
+    regressions = []
+    for size, result in current['results'].items():
+        base_cases = baseline.get('results', {}).get(size, {}).get('cases', {})
+        for name, case in result['cases'].items():
+            base = base_cases.get(name)
+            if not base:
+                continue
+            pairs = [('total', base['median'], case['median'])]
+            pairs.extend((phase, base['phases'][phase], elapsed)
+                         for phase, elapsed in case['phases'].items() if phase in base['phases'])
+            for phase, before, after in pairs:
+                if after > before * (1 + tolerance) and after - before > min_delta:
+                    regressions.append((size, name, phase, before, after))
+    return regressions
+
+
+def print_regressions(regressions, tolerance):
+    if not regressions:
+        print(f"\n与基线相比没有超过 {tolerance:.0%} 的退化")
+        return
+    print(f"\n与基线相比的退化 ({len(regressions)}):")
+    for size, name, phase, before, after in regressions:
+        print(f"  - {size} {name} {phase}: {before:.3f}s -> {after:.3f}s (+{after / max(before, 1e-9) - 1:.0%})")
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != RESULTS_VERSION:
+        raise SystemExit(f"不支持的结果版本: {path}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="维护脚本的性能基准")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='生成合成 ets 源码树')
+    generate.add_argument('--files', type=parse_size, default=SIZES['1k'], help='文件数量, 可写 1k/10k/100k')
+    generate.add_argument('--out', required=True, help='输出目录')
+    generate.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+
+    run = commands.add_parser('run', help='运行基准并写出 JSON 结果')
+    run.add_argument('--sizes', nargs='+', type=size_name, default=DEFAULT_SIZES, help='规模列表 (默认: 1k 10k)')
+    run.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES), help='只运行指定用例')
+    run.add_argument('--repeat', type=int, default=3, help='每个用例重复次数 (默认: 3)')
+    run.add_argument('--jobs', '-j', type=int, default=1, help='传给修复脚本的并行进程数 (默认: 1)')
+    run.add_argument('--work', default=os.path.join(tempfile.gettempdir(), 'astroread-bench'),
+                     help='合成源码树与工作目录的位置')
+    run.add_argument('--output', default='bench.json', help='结果文件 (默认: bench.json)')
+    run.add_argument('--baseline', help='与该基线结果对比, 有退化时以非零状态退出')
+    run.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='允许的变慢比例 (默认: 0.15)')
+
+    comp = commands.add_parser('compare', help='对比两份结果')
+    comp.add_argument('current', help='本次结果')
+    comp.add_argument('baseline', help='基线结果')
+    comp.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='允许的变慢比例 (默认: 0.15)')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        meta = generate_tree(args.out, args.files, args.seed)
+        print(f"已生成 {meta['files']} 个文件: {args.out}")
+        return
+
+    if args.command == 'run':
+        current = {
+            'version': RESULTS_VERSION,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'jobs': args.jobs,
+            'repeat': args.repeat,
+            'results': run_benchmarks(args.sizes, args.cases, args.repeat, args.jobs, args.work),
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.output}")
+        if not args.baseline:
+            return
+        baseline = load_results(args.baseline)
+    else:
+        current = load_results(args.current)
+        baseline = load_results(args.baseline)
+
+    regressions = compare(current, baseline, args.tolerance)
+    print_regressions(regressions, args.tolerance)
+    if regressions:
+        sys.exit(1)
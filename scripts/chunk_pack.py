@@ -0,0 +1,211 @@
+import bisect
+import json
+import os
+import re
+import shutil
+
+from import_graph import ImportGraph
+from merged_dump import IndexWriter, MergedDump, index_path
+
+# 打包输出位于合并目录下的子目录, 清单记录每个块包含的文件
+CHUNK_DIR = 'chunks'
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+COST_UNITS = ('tokens', 'bytes')
+
+# 粗略的词元估计: ASCII 约 4 个字符一个词元, 其他字符 (中文等) 各算一个
+_WIDE = re.compile(r'[^\x00-\x7f]')
+
+
+def estimate_tokens(text):
+    wide = len(_WIDE.findall(text))
+    return (len(text) - wide + 3) // 4 + wide
+
+
+def chunk_header(path):
+    return f"{'=' * 50}\n文件: {path}\n{'=' * 50}\n\n"
+
+
+def file_cost(path, data, unit):
+    # 成本包含分隔标识和结尾空行, 与写入块文件的内容一致
+    if unit == 'bytes':
+        return len(chunk_header(path).encode('utf-8')) + len(data) + 2
+    return estimate_tokens(chunk_header(path)) + estimate_tokens(data.decode('utf-8', errors='replace')) + 1
+
+
+def build_clusters(paths, groups, graph=None, prefix=''):
+    """把应尽量放在同一块中的文件聚成簇, 返回 {簇名: [文件路径]}。
+
+    同一 functional_groups 分类的文件、循环依赖中的文件、以及只被一个模块导入的模块与其导入方
+    各归为一簇; graph 中的路径加上 prefix 后与 paths 对应。
+    """
+    parent = {path: path for path in paths}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(a, b):
+        if a in parent and b in parent:
+            parent[find(a)] = find(b)
+
+    labels = {}
+    for group_name, members in groups.items():
+        members = [member for member in members if member in parent]
+        for member in members:
+            labels.setdefault(member, group_name)
+            union(member, members[0])
+
+    if graph is not None:
+        graph.parse_all()
+        for component in graph.cycles(graph.edges):
+            for member in component[1:]:
+                union(prefix + member, prefix + component[0])
+        importers = {}
+        for rel_file in graph.edges:
+            for target in graph.edges[rel_file] + graph.type_edges[rel_file]:
+                importers.setdefault(target, set()).add(rel_file)
+        for target, sources in importers.items():
+            if len(sources) == 1:
+                union(prefix + target, prefix + next(iter(sources)))
+
+    clusters = {}
+    for path in paths:
+        clusters.setdefault(find(path), []).append(path)
+    named = {}
+    for members in clusters.values():
+        members.sort()
+        # 含分类文件的簇以分类命名, 否则以第一个文件命名
+        label = next((labels[member] for member in members if member in labels), members[0])
+        named[label] = members
+    return named
+
+
+def split_cluster(members, costs, budget):
+    # 超出预算的簇按路径顺序依次装入, 装不下时开始新的一段
+    pieces = [[]]
+    used = 0
+    for member in members:
+        if pieces[-1] and used + costs[member] > budget:
+            pieces.append([])
+            used = 0
+        pieces[-1].append(member)
+        used += costs[member]
+    return pieces
+
+
+def pack(clusters, costs, budget):
+    """最佳适应递减 (best-fit decreasing) 装箱, 返回 [[文件路径]], 每块按路径排序。
+
+    各段按成本从大到小放入剩余空间最小且放得下的块, 剩余空间保存在有序列表中二分查找,
+    总体 O(n log n)。单个文件超出预算时独占一块。
+    """
+    pieces = []
+    for members in clusters.values():
+        pieces.extend(split_cluster(members, costs, budget))
+    pieces.sort(key=lambda piece: (-sum(costs[member] for member in piece), piece[0]))
+
+    bins = []
+    free = []
+    for piece in pieces:
+        cost = sum(costs[member] for member in piece)
+        i = bisect.bisect_left(free, (cost, -1))
+        if i < len(free):
+            remaining, bin_id = free.pop(i)
+            bins[bin_id].extend(piece)
+        else:
+            remaining, bin_id = budget, len(bins)
+            bins.append(list(piece))
+        if remaining - cost > 0:
+            bisect.insort(free, (remaining - cost, bin_id))
+    for members in bins:
+        members.sort()
+    bins.sort(key=lambda members: members[0])
+    return bins
+
+
+def load_dumps(merged_files):
+    # 每个文件只取第一次出现的位置; 去重条目由 MergedDump 解析为完整内容
+    dumps = []
+    locations = {}
+    for merged_file in merged_files:
+        if not os.path.exists(index_path(merged_file)):
+            continue
+        dump = MergedDump(merged_file)
+        dumps.append(dump)
+        for path in dump.paths():
+            locations.setdefault(path, dump)
+    return dumps, locations
+
+
+def pack_dump(merged_files, chunk_dir, budget, unit='tokens', groups=None, graph=None, prefix=''):
+    """把若干合并文件中的所有文件重新打包为预算内的编号块, 写出块文件、索引和清单。
+
+    groups 为 {分类名: [文件路径]}; graph 为源码树的 ImportGraph, 其路径加上 prefix 后
+    与合并文件索引中的路径对应。返回清单内容。
+    """
+    dumps, locations = load_dumps(merged_files)
+    try:
+        costs = {path: file_cost(path, dump.read_bytes(path), unit) for path, dump in locations.items()}
+        clusters = build_clusters(sorted(locations), groups or {}, graph, prefix)
+        bins = pack(clusters, costs, budget)
+
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+        os.makedirs(chunk_dir, exist_ok=True)
+        cluster_of = {member: label for label, members in clusters.items() for member in members}
+        chunks = []
+        for number, members in enumerate(bins, 1):
+            chunk_path = os.path.join(chunk_dir, f'chunk_{number:04d}.txt')
+            index = IndexWriter(chunk_path)
+            with open(chunk_path, 'wb') as chunk_file:
+                for path in members:
+                    dump = locations[path]
+                    entry = dump.entries[path]
+                    chunk_file.write(chunk_header(path).encode('utf-8'))
+                    data = dump.read_bytes(path)
+                    index.add(path, entry['name'], chunk_file.tell(), len(data), entry['sha1'],
+                              line_map=entry.get('line_map'))
+                    chunk_file.write(data)
+                    chunk_file.write(b'\n\n')
+            index.save()
+            chunks.append({
+                'file': os.path.basename(chunk_path),
+                'cost': sum(costs[path] for path in members),
+                'files': members,
+                'clusters': sorted({cluster_of[path] for path in members}),
+            })
+    finally:
+        for dump in dumps:
+            dump.close()
+
+    chunk_of = {}
+    for chunk in chunks:
+        for label in chunk['clusters']:
+            chunk_of.setdefault(label, []).append(chunk['file'])
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'budget': budget,
+        'unit': unit,
+        'chunks': chunks,
+        # 被拆到多个块中的簇
+        'split_clusters': {label: files for label, files in sorted(chunk_of.items()) if len(files) > 1},
+    }
+    with open(os.path.join(chunk_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    total = sum(chunk['cost'] for chunk in chunks)
+    oversize = sum(1 for chunk in chunks if chunk['cost'] > budget)
+    fill = total / (len(chunks) * budget) if chunks else 0
+    print(f"\n打包: {len(costs)} 个文件 -> {len(chunks)} 个块 (预算 {budget} {unit}, 平均填充 {fill:.0%}), "
+          f"{len(manifest['split_clusters'])} 个簇被拆分, {oversize} 个块因单个文件超出预算: {chunk_dir}")
+    return manifest
+
+
+def source_graph(source_dir):
+    # 源码树中的 ets 目录存在时按导入关系聚簇, 索引路径以 ets/ 开头
+    ets_dir = os.path.join(source_dir, 'ets')
+    if not os.path.isdir(ets_dir):
+        return None, ''
+    return ImportGraph(ets_dir), 'ets/'
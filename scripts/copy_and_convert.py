@@ -1,5 +1,17 @@
+import argparse
+import hashlib
+import json
 import os
 import shutil
+import tempfile
+import time
+
+from archive_writer import ArchiveWriter, archive_mode
+from chunk_pack import CHUNK_DIR, COST_UNITS, pack_dump, source_graph
+from ets_strip import STRIP_SUFFIXES, compress_line_map, strip_source
+from file_watcher import open_watcher, watch
+from merged_dump import ContentStore, IndexWriter, file_digest, index_path
+from path_filter import DEFAULT_EXCLUDES, SNIFF_SIZE, PathFilter, is_binary, is_binary_file
 
 # 源目录和目标目录
 source_dir = r"F:\MyApplication\AstroRead\entry\src\main"
@@ -55,159 +67,817 @@ functional_groups = {
     ],
 }
 
-# 确保目标目录存在
-os.makedirs(target_dir, exist_ok=True)
-
-# 创建功能分类文件夹
-functional_dirs = {}
-for group_name in functional_groups.keys():
-    group_dir = os.path.join(target_dir, group_name)
-    os.makedirs(group_dir, exist_ok=True)
-    functional_dirs[group_name] = group_dir
-
-# 遍历源目录下的所有文件和文件夹
-for root, dirs, files in os.walk(source_dir):
-    for file in files:
-        source_file_path = os.path.join(root, file)
-        # 计算相对路径
-        relative_path = os.path.relpath(source_file_path, source_dir)
-        # 构建目标文件路径
-        target_file_path = os.path.join(target_dir, relative_path)
-        # 确保目标文件的目录存在
-        os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
-        # 复制文件
-        shutil.copy2(source_file_path, target_file_path)
-        print(f"已复制: {source_file_path} -> {target_file_path}")
-
-print("所有文件复制完成！")
-
-# 遍历目标目录下的所有文件，将非txt文件转换为txt格式
-for root, dirs, files in os.walk(target_dir):
-    for file in files:
-        file_path = os.path.join(root, file)
-        # 如果文件不是txt格式，则转换为txt
-        if not file.lower().endswith('.txt'):
-            # 读取文件内容
+# 流式模式的依赖记录, 保存在合并目录中
+DEPS_FILE = '.dump_deps.json'
+DEPS_VERSION = 1
+
+# 合并阶段回退到用户态拷贝时的块大小
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 归档模式下合并文件先写入临时文件, 超过该大小才落盘
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def encode_text(text):
+    # 与文本模式写入一致: 换行符按平台转换后编码为 UTF-8
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
+
+
+class MergeStats:
+    """合并阶段的写入工具, 同时统计写入字节数和吞吐量。
+
+    输出文件需以无缓冲二进制模式打开, 这样 os.sendfile 与普通写入可以交替进行。
+    """
+
+    def __init__(self):
+        self.bytes_written = 0
+        self.start = time.perf_counter()
+
+    def write(self, merged_file, text):
+        self.write_bytes(merged_file, encode_text(text))
+
+    def write_bytes(self, merged_file, data):
+        # 无缓冲的 FileIO.write 可能只写入一部分, 循环写完, 之后的索引偏移才正确
+        view = memoryview(data)
+        while view:
+            view = view[merged_file.write(view):]
+        self.bytes_written += len(data)
+
+    def copy(self, merged_file, file_path):
+        # 优先用 os.sendfile 在内核中拷贝, 不支持时退回 shutil.copyfileobj
+        with open(file_path, 'rb') as src:
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            if hasattr(os, 'sendfile'):
+                try:
+                    while offset < size:
+                        sent = os.sendfile(merged_file.fileno(), src.fileno(), offset, size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                except OSError:
+                    pass
+            if offset < size:
+                src.seek(offset)
+                shutil.copyfileobj(src, merged_file, COPY_CHUNK_SIZE)
+                offset = src.tell()
+        self.bytes_written += offset
+        return offset
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        megabytes = self.bytes_written / (1024 * 1024)
+        print(f"\n合并输出 {megabytes:.2f} MB, 用时 {elapsed:.2f} 秒, 吞吐量 {megabytes / elapsed:.2f} MB/s")
+
+
+def add_index_entry(index, origins, file_path, name, offset, length):
+    # 原本就是 txt 的文件没有转换记录, 路径取镜像树中的相对路径, 哈希现场计算
+    origin, digest = origins.get(file_path, (os.path.relpath(file_path, target_dir), None))
+    index.add(origin, name, offset, length, digest or file_digest(file_path))
+
+
+def merged_body(source_file_path, payload, digest, strip):
+    """合并文件中的正文, 返回 (正文, SHA-1, 压缩后的行号映射)。
+
+    strip 时 ArkTS / TS / JS 源文件去掉注释和多余空行, 行号映射记录每行对应的原始行号。
+    """
+    if not strip or not source_file_path.endswith(STRIP_SUFFIXES):
+        return payload, digest, None
+    text = payload.decode('utf-8')
+    if os.linesep != '\n':
+        text = text.replace(os.linesep, '\n')
+    stripped, line_map = strip_source(text)
+    body = encode_text(stripped)
+    return body, hashlib.sha1(body).hexdigest(), compress_line_map(line_map)
+
+
+def write_body(stats, merged_file, index, store, key, name, payload, digest, source, line_map=None):
+    # 写入一个文件的正文并登记索引; 给出 store 时重复内容写引用, 近似重复写差异
+    placed = store.place(index.merged_path, key, payload, digest, source) if store else None
+    if placed is None:
+        index.add(key, name, merged_file.tell(), len(payload), digest, line_map=line_map)
+        stats.write_bytes(merged_file, payload)
+        return
+    dedup, base, note, body = placed
+    stats.write(merged_file, note)
+    index.add(key, name, merged_file.tell(), len(body), digest, dedup, base, line_map)
+    stats.write_bytes(merged_file, body)
+
+
+def content_store(dedup, strip=False):
+    # 规范副本的内容按需从源文件重新读取, 与写入合并文件时做同样的处理
+    if not dedup:
+        return None
+    return ContentStore(lambda source: merged_body(source, read_source(source)[2], None, strip)[0])
+
+
+def convert(path_filter):
+    """原有流程: 复制整棵树, 转换为 txt, 再按功能分类提取并合并。"""
+    # 确保目标目录存在
+    os.makedirs(target_dir, exist_ok=True)
+
+    # 创建功能分类文件夹
+    functional_dirs = {}
+    for group_name in functional_groups.keys():
+        group_dir = os.path.join(target_dir, group_name)
+        os.makedirs(group_dir, exist_ok=True)
+        functional_dirs[group_name] = group_dir
+
+    # 遍历源目录下的所有文件和文件夹, 被排除的目录不会进入
+    for root, dirs, files in path_filter.walk(source_dir):
+        for file in files:
+            source_file_path = os.path.join(root, file)
+            # 复制前先嗅探文件头, 二进制文件不复制也不转换
+            if is_binary_file(source_file_path):
+                print(f"跳过二进制文件: {source_file_path}")
+                continue
+            # 计算相对路径
+            relative_path = os.path.relpath(source_file_path, source_dir)
+            # 构建目标文件路径
+            target_file_path = os.path.join(target_dir, relative_path)
+            # 确保目标文件的目录存在
+            os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
+            # 复制文件
+            shutil.copy2(source_file_path, target_file_path)
+            print(f"已复制: {source_file_path} -> {target_file_path}")
+
+    print("所有文件复制完成！")
+
+    # 镜像树中 txt 文件 -> (原始相对路径, 内容 SHA-1), 用于写合并文件索引
+    origins = {}
+
+    # 遍历目标目录下的所有文件，将非txt文件转换为txt格式
+    for root, dirs, files in os.walk(target_dir):
+        # 合并目录中的索引文件不做转换
+        if root.startswith(merged_dir):
+            continue
+        for file in files:
+            file_path = os.path.join(root, file)
+            # 如果文件不是txt格式，则转换为txt
+            if not file.lower().endswith('.txt'):
+                # 读取文件内容
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    # 构建新的txt文件路径
+                    txt_file_path = os.path.splitext(file_path)[0] + '.txt'
+                    # 写入txt文件
+                    with open(txt_file_path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    origins[txt_file_path] = (os.path.relpath(file_path, target_dir),
+                                              hashlib.sha1(encode_text(content)).hexdigest())
+                    print(f"已转换: {file_path} -> {txt_file_path}")
+                    # 删除原文件
+                    os.remove(file_path)
+                except Exception as e:
+                    print(f"转换失败: {file_path}, 错误: {e}")
+
+    print("所有文件转换完成！")
+
+    # 按功能分类提取文件
+    print("\n开始按功能分类提取文件...")
+
+    for group_name, file_list in functional_groups.items():
+        group_dir = functional_dirs[group_name]
+        print(f"\n处理功能分类: {group_name}")
+
+        for relative_file in file_list:
+            # 构建源txt文件路径（已转换后的路径）
+            txt_relative_path = os.path.splitext(relative_file)[0] + '.txt'
+            source_txt_path = os.path.join(target_dir, txt_relative_path)
+
+            if os.path.exists(source_txt_path):
+                # 获取原文件名（不带路径）
+                original_filename = os.path.basename(txt_relative_path)
+                target_file_path = os.path.join(group_dir, original_filename)
+
+                # 复制文件（保持原文件名）
+                shutil.copy2(source_txt_path, target_file_path)
+                origins[target_file_path] = origins.get(source_txt_path, (group_source_path(relative_file), None))
+                print(f"  已提取: {original_filename}")
+            else:
+                print(f"  文件不存在，跳过: {txt_relative_path}")
+
+    print("\n功能分类提取完成！")
+
+    # 创建合并文件夹
+    os.makedirs(merged_dir, exist_ok=True)
+
+    # 为每个功能分类创建合并文件
+    print("\n开始创建功能分类合并文件...")
+    stats = MergeStats()
+
+    for group_name in functional_groups.keys():
+        group_dir = functional_dirs[group_name]
+        merged_file_path = os.path.join(merged_dir, f"{group_name}_merged.txt")
+
+        # 逐个文件流式拷贝到合并文件, 内存占用与分类大小无关
+        index = IndexWriter(merged_file_path)
+        with open(merged_file_path, 'wb', buffering=0) as merged_file:
+            stats.write(merged_file, "\n".join(["=" * 80, f"{group_name} - 合并文件", "=" * 80, ""]))
+
+            # 遍历功能文件夹，合并所有txt文件
+            for file in sorted(os.listdir(group_dir)):
+                if file.lower().endswith('.txt'):
+                    file_path = os.path.join(group_dir, file)
+                    try:
+                        stats.write(merged_file, "\n" + "\n".join(["=" * 80, f"文件: {file}", "=" * 80, "", ""]))
+                        offset = merged_file.tell()
+                        length = stats.copy(merged_file, file_path)
+                        stats.write(merged_file, "\n\n")
+                        add_index_entry(index, origins, file_path, file, offset, length)
+                    except Exception as e:
+                        print(f"读取失败: {file_path}, 错误: {e}")
+        index.save()
+        print(f"已创建合并文件: {merged_file_path}")
+
+    # 遍历目标目录（排除功能分类文件夹和merged文件夹），合并每个子文件夹内的txt文件
+    print("\n开始合并其他文件...")
+
+    exclude_dirs = set(functional_dirs.values())
+    exclude_dirs.add(merged_dir)
+
+    for root, dirs, files in os.walk(target_dir):
+        # 跳过功能分类文件夹和merged目录
+        if any(root.startswith(exclude) for exclude in exclude_dirs):
+            continue
+
+        # 获取当前目录下的所有txt文件
+        txt_files = [f for f in files if f.lower().endswith('.txt')]
+
+        if txt_files:
+            # 计算相对路径，用于命名合并后的文件
+            relative_path = os.path.relpath(root, target_dir)
+            # 替换路径分隔符为下划线，用于文件名
+            merged_file_name = relative_path.replace(os.sep, '_') + '_merged.txt'
+            merged_file_path = os.path.join(merged_dir, merged_file_name)
+
+            # 合并所有txt文件
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                # 构建新的txt文件路径
-                txt_file_path = os.path.splitext(file_path)[0] + '.txt'
-                # 写入txt文件
-                with open(txt_file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                print(f"已转换: {file_path} -> {txt_file_path}")
-                # 删除原文件
-                os.remove(file_path)
+                index = IndexWriter(merged_file_path)
+                with open(merged_file_path, 'wb', buffering=0) as merged_file:
+                    for txt_file in sorted(txt_files):
+                        txt_file_path = os.path.join(root, txt_file)
+                        # 写入文件分隔标识
+                        stats.write(merged_file, f"{'='*50}\n文件: {txt_file}\n{'='*50}\n\n")
+                        offset = merged_file.tell()
+                        length = stats.copy(merged_file, txt_file_path)
+                        stats.write(merged_file, "\n\n")
+                        add_index_entry(index, origins, txt_file_path, txt_file, offset, length)
+                index.save()
+                print(f"已合并: {root} -> {merged_file_path}")
             except Exception as e:
-                print(f"转换失败: {file_path}, 错误: {e}")
-
-print("所有文件转换完成！")
-
-# 按功能分类提取文件
-print("\n开始按功能分类提取文件...")
-
-for group_name, file_list in functional_groups.items():
-    group_dir = functional_dirs[group_name]
-    print(f"\n处理功能分类: {group_name}")
-    
-    for relative_file in file_list:
-        # 构建源txt文件路径（已转换后的路径）
-        txt_relative_path = os.path.splitext(relative_file)[0] + '.txt'
-        source_txt_path = os.path.join(target_dir, txt_relative_path)
-        
-        if os.path.exists(source_txt_path):
-            # 获取原文件名（不带路径）
-            original_filename = os.path.basename(txt_relative_path)
-            target_file_path = os.path.join(group_dir, original_filename)
-            
-            # 复制文件（保持原文件名）
-            shutil.copy2(source_txt_path, target_file_path)
-            print(f"  已提取: {original_filename}")
+                print(f"合并失败: {root}, 错误: {e}")
+
+    stats.report()
+    print("\n所有文件处理完成！")
+    print(f"\n输出目录结构:")
+    print(f"  - {target_dir} (所有文件)")
+    for group_name in functional_groups.keys():
+        print(f"  - {os.path.join(target_dir, group_name)} ({group_name}相关文件)")
+    print(f"  - {merged_dir} (合并后的文件)")
+
+
+def group_source_path(relative_file):
+    # functional_groups 中的路径按 Windows 写法给出, 转成当前平台的分隔符
+    return os.path.join(*relative_file.replace('\\', '/').split('/'))
+
+
+def txt_name(file_name):
+    if file_name.lower().endswith('.txt'):
+        return file_name
+    return os.path.splitext(file_name)[0] + '.txt'
+
+
+def group_key(relative_file):
+    # functional_groups 中的路径统一为 / 分隔, 作为依赖记录中的输入名
+    return os.path.normpath(group_source_path(relative_file)).replace(os.sep, '/')
+
+
+def read_source(source_file_path):
+    """读取一个源文件, 返回 (类型, 原始字节, 编码后的内容)。
+
+    类型为 text / raw (无法按 UTF-8 解码) / binary; 二进制文件只读取开头用于嗅探的部分。
+    """
+    with open(source_file_path, 'rb') as f:
+        data = f.read(SNIFF_SIZE)
+        if is_binary(data):
+            return 'binary', data, None
+        data += f.read()
+    try:
+        # 与文本模式读取一致: UTF-8 解码并统一换行符
+        content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    except UnicodeDecodeError:
+        return 'raw', data, None
+    # 各输出共用同一份编码结果
+    return 'text', data, encode_text(content)
+
+
+def source_digest(kind, data, payload):
+    if kind == 'binary':
+        return ''
+    return hashlib.sha1(payload if kind == 'text' else data).hexdigest()
+
+
+def load_deps(deps_path):
+    try:
+        with open(deps_path, 'r', encoding='utf-8') as f:
+            deps = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return deps if deps.get('version') == DEPS_VERSION else {}
+
+
+def save_deps(deps_path, deps):
+    tmp_path = deps_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(deps, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, deps_path)
+
+
+def write_output(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def remove_output(path):
+    for stale_path in (path, index_path(path)):
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+    # 顺带清理变空的目录, 但不越过目标目录
+    parent = os.path.dirname(path)
+    while os.path.abspath(parent) != os.path.abspath(target_dir) and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+    print(f"已删除: {path}")
+
+
+def dirty_walk(path_filter, prev_inputs, dirty_dirs, dirty_trees):
+    """监视模式的局部遍历: 只重新列出有变化的目录 (dirty_trees 中的目录连同子目录),
+    其余目录按上次的输入记录还原, 不访问磁盘。
+
+    产出 (目录路径, 文件列表, 是否沿用记录), 目录顺序与 walk 一致。
+    """
+    known = {}
+    for key in prev_inputs:
+        rel_dir, _, file = key.rpartition('/')
+        known.setdefault(rel_dir, []).append(file)
+
+    listed = {}
+    for rel_dir in dirty_dirs:
+        for root, _, files in path_filter.scan(source_dir, rel_dir):
+            listed[rel_dir] = files
+    for tree in dirty_trees:
+        for root, _, files in path_filter.scan(source_dir, tree, recursive=True):
+            rel_dir = os.path.relpath(root, source_dir).replace(os.sep, '/')
+            listed['' if rel_dir == '.' else rel_dir] = files
+
+    def in_dirty_tree(rel_dir):
+        return any(not tree or rel_dir == tree or rel_dir.startswith(tree + '/') for tree in dirty_trees)
+
+    # 有变化但已不存在的目录不再产出, 其输出会被当作过期输出删除
+    rel_dirs = set(listed)
+    rel_dirs.update(rel_dir for rel_dir in known if rel_dir not in dirty_dirs and not in_dirty_tree(rel_dir))
+    for rel_dir in sorted(rel_dirs, key=lambda rel_dir: rel_dir.split('/') if rel_dir else []):
+        root = os.path.join(source_dir, *rel_dir.split('/')) if rel_dir else source_dir
+        if rel_dir in listed:
+            yield root, listed[rel_dir], False
         else:
-            print(f"  文件不存在，跳过: {txt_relative_path}")
-
-print("\n功能分类提取完成！")
-
-# 创建合并文件夹
-os.makedirs(merged_dir, exist_ok=True)
-
-# 为每个功能分类创建合并文件
-print("\n开始创建功能分类合并文件...")
-
-for group_name in functional_groups.keys():
-    group_dir = functional_dirs[group_name]
-    merged_file_path = os.path.join(merged_dir, f"{group_name}_merged.txt")
-    
-    contents = []
-    contents.append("=" * 80)
-    contents.append(f"{group_name} - 合并文件")
-    contents.append("=" * 80)
-    contents.append("")
-    
-    # 遍历功能文件夹，合并所有txt文件
-    for file in sorted(os.listdir(group_dir)):
-        if file.lower().endswith('.txt'):
-            file_path = os.path.join(group_dir, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                contents.append("=" * 80)
-                contents.append(f"文件: {file}")
-                contents.append("=" * 80)
-                contents.append("")
-                contents.append(content)
-                contents.append("")
-                contents.append("")
-            except Exception as e:
-                print(f"读取失败: {file_path}, 错误: {e}")
-    
-    # 写入合并文件
-    with open(merged_file_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(contents))
-    print(f"已创建合并文件: {merged_file_path}")
-
-# 遍历目标目录（排除功能分类文件夹和merged文件夹），合并每个子文件夹内的txt文件
-print("\n开始合并其他文件...")
-
-exclude_dirs = set(functional_dirs.values())
-exclude_dirs.add(merged_dir)
-
-for root, dirs, files in os.walk(target_dir):
-    # 跳过功能分类文件夹和merged目录
-    if any(root.startswith(exclude) for exclude in exclude_dirs):
-        continue
-    
-    # 获取当前目录下的所有txt文件
-    txt_files = [f for f in files if f.lower().endswith('.txt')]
-    
-    if txt_files:
-        # 计算相对路径，用于命名合并后的文件
-        relative_path = os.path.relpath(root, target_dir)
-        # 替换路径分隔符为下划线，用于文件名
-        merged_file_name = relative_path.replace(os.sep, '_') + '_merged.txt'
-        merged_file_path = os.path.join(merged_dir, merged_file_name)
-        
-        # 合并所有txt文件
-        try:
-            with open(merged_file_path, 'w', encoding='utf-8') as merged_file:
-                for txt_file in sorted(txt_files):
-                    txt_file_path = os.path.join(root, txt_file)
-                    with open(txt_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    # 写入文件分隔标识
-                    merged_file.write(f"{'='*50}\n")
-                    merged_file.write(f"文件: {txt_file}\n")
-                    merged_file.write(f"{'='*50}\n\n")
-                    merged_file.write(content)
-                    merged_file.write("\n\n")
-            print(f"已合并: {root} -> {merged_file_path}")
-        except Exception as e:
-            print(f"合并失败: {root}, 错误: {e}")
-
-print("\n所有文件处理完成！")
-print(f"\n输出目录结构:")
-print(f"  - {target_dir} (所有文件)")
-for group_name in functional_groups.keys():
-    print(f"  - {os.path.join(target_dir, group_name)} ({group_name}相关文件)")
-print(f"  - {merged_dir} (合并后的文件)")
+            yield root, sorted(known[rel_dir]), True
+
+
+def plan_dump(path_filter, prev_inputs, warm, dirty=None):
+    """遍历源码树, 返回 (按目录分组的源文件列表, 输入记录)。
+
+    输入记录为 相对路径 -> [size, mtime_ns, sha1, 类型]; 增量模式下只有 size/mtime
+    变化的文件会在这一步读取并计算哈希, 否则哈希留空, 由生成阶段补齐。
+    dirty 为 (有变化的目录, 有变化的目录树) 时只检查这些目录, 见 dirty_walk。
+    """
+    if dirty is None:
+        walk = ((root, files, False) for root, _, files in path_filter.walk(source_dir))
+    else:
+        walk = dirty_walk(path_filter, prev_inputs, *dirty)
+
+    plan = []
+    inputs = {}
+    for root, files, trusted in walk:
+        relative_root = os.path.relpath(root, source_dir)
+
+        # 转换后同名的文件 (a.ets / a.json -> a.txt) 只保留最后一个, 与覆盖写入的结果一致
+        by_name = {}
+        for file in files:
+            by_name[txt_name(file)] = file
+
+        entries = []
+        for name in sorted(by_name):
+            file = by_name[name]
+            source_file_path = os.path.join(root, file)
+            key = os.path.normpath(os.path.join(relative_root, file)).replace(os.sep, '/')
+            record = prev_inputs.get(key)
+            if not trusted:
+                st = os.stat(source_file_path)
+                if not (record and record[0] == st.st_size and record[1] == st.st_mtime_ns):
+                    if warm:
+                        kind, data, payload = read_source(source_file_path)
+                        record = [st.st_size, st.st_mtime_ns, source_digest(kind, data, payload), kind]
+                    else:
+                        record = [st.st_size, st.st_mtime_ns, None, None]
+            inputs[key] = record
+            entries.append((name, file, key))
+        plan.append((root, relative_root, entries))
+    return plan, inputs
+
+
+def plan_outputs(plan, inputs, file_groups):
+    # 输出 id -> [输出路径, [[输入, 哈希], ...]], 输入按写入顺序排列
+    planned = {}
+    for group_name in functional_groups.keys():
+        planned[f'group_merged|{group_name}'] = [os.path.join(merged_dir, f"{group_name}_merged.txt"), []]
+
+    for root, relative_root, entries in plan:
+        target_root = os.path.join(target_dir, relative_root)
+        merged_file_name = relative_root.replace(os.sep, '_') + '_merged.txt'
+        dir_id = 'dir_merged|' + relative_root.replace(os.sep, '/')
+        for name, file, key in entries:
+            size, mtime, digest, kind = inputs[key]
+            if kind == 'binary':
+                continue
+            if kind == 'raw':
+                planned['mirror|' + key] = [os.path.join(target_root, file), [[key, digest]]]
+                continue
+            planned['mirror|' + key] = [os.path.join(target_root, name), [[key, digest]]]
+            for group_name in file_groups.get(key, []):
+                planned[f'group|{group_name}|{name}'] = [os.path.join(target_dir, group_name, name), [[key, digest]]]
+                planned[f'group_merged|{group_name}'][1].append([key, digest])
+            planned.setdefault(dir_id, [os.path.join(merged_dir, merged_file_name), []])[1].append([key, digest])
+    return planned
+
+
+def file_group_map():
+    # 源文件相对路径 -> 所属功能分类
+    file_groups = {}
+    for group_name, file_list in functional_groups.items():
+        for relative_file in file_list:
+            file_groups.setdefault(group_key(relative_file), []).append(group_name)
+    return file_groups
+
+
+def stream_convert(path_filter, incremental=False, dirty=None, dedup=False, strip=False):
+    """流式处理: 每个源文件只读取一次, 直接写入镜像树、功能分类文件夹和所有合并文件。
+
+    不生成中间副本, 功能分类合并文件中的文件按源路径顺序排列。每次运行都会在合并目录中
+    写入依赖记录, 登记每个输出由哪些输入 (及其内容哈希) 生成; incremental=True 时只重新生成
+    输入有变化的输出, 并删除源文件已不存在的输出; 再给出 dirty 时只检查其中的目录 (监视模式)。
+    dedup=True 时合并文件按内容去重 (见 merged_dump.ContentStore), 只能完整生成;
+    strip=True 时合并文件中的源码去掉注释和多余空行 (见 ets_strip), 索引中记录行号映射。
+    """
+    file_groups = file_group_map()
+
+    os.makedirs(merged_dir, exist_ok=True)
+    deps_path = os.path.join(merged_dir, DEPS_FILE)
+    previous = load_deps(deps_path)
+    old_outputs = previous.get('outputs', {})
+    # 功能分类或输出格式变化后, 旧记录不能再用于判断是否需要重建
+    config = repr(sorted(functional_groups.items())) + (' dedup' if dedup else '') + (' strip' if strip else '')
+    config = hashlib.sha1(config.encode('utf-8')).hexdigest()
+    warm = incremental and previous.get('config') == config
+
+    plan, inputs = plan_dump(path_filter, previous.get('inputs', {}) if warm else {}, warm, dirty if warm else None)
+    planned = plan_outputs(plan, inputs, file_groups)
+
+    def is_fresh(output_id):
+        path, deps = planned[output_id]
+        return (warm and old_outputs.get(output_id) == [path, deps]
+                and all(digest for _, digest in deps) and os.path.exists(path))
+
+    stale = {output_id for output_id in planned if not is_fresh(output_id)}
+    outputs = {output_id: old_outputs[output_id] for output_id in planned if output_id not in stale}
+
+    # 删除源文件已不存在 (或输出位置已改变) 的旧输出
+    planned_paths = {path for path, _ in planned.values()}
+    for output_id, (path, _) in old_outputs.items():
+        if path not in planned_paths:
+            remove_output(path)
+
+    stats = MergeStats()
+    store = content_store(dedup, strip)
+    group_merged = {}
+    group_indexes = {}
+    for group_name in functional_groups.keys():
+        os.makedirs(os.path.join(target_dir, group_name), exist_ok=True)
+        group_id = f'group_merged|{group_name}'
+        if group_id not in stale:
+            continue
+        merged_file = open(planned[group_id][0], 'wb')
+        group_indexes[group_name] = IndexWriter(merged_file.name)
+        stats.write(merged_file, '\n'.join(["=" * 80, f"{group_name} - 合并文件", "=" * 80, ""]))
+        group_merged[group_name] = merged_file
+        outputs[group_id] = [merged_file.name, []]
+
+    try:
+        for root, relative_root, entries in plan:
+            target_root = os.path.join(target_dir, relative_root)
+            dir_id = 'dir_merged|' + relative_root.replace(os.sep, '/')
+            dir_merged = None
+            dir_index = None
+            for name, file, key in entries:
+                mirror_id = 'mirror|' + key
+                groups = file_groups.get(key, [])
+                needed = {mirror_id, dir_id}
+                for group_name in groups:
+                    needed.update((f'group|{group_name}|{name}', f'group_merged|{group_name}'))
+                # 所有相关输出都没有过期的文件不再读取
+                if not needed & stale:
+                    continue
+
+                source_file_path = os.path.join(root, file)
+                kind, data, payload = read_source(source_file_path)
+                digest = source_digest(kind, data, payload)
+                inputs[key][2:] = [digest, kind]
+                if kind == 'binary':
+                    print(f"跳过二进制文件: {source_file_path}")
+                    continue
+                if kind == 'raw':
+                    # 无法转换的文件按原样保留在镜像树中
+                    raw_path = os.path.join(target_root, file)
+                    write_output(raw_path, data)
+                    outputs[mirror_id] = [raw_path, [[key, digest]]]
+                    print(f"转换失败: {source_file_path}, 错误: 无法按 UTF-8 解码")
+                    continue
+
+                if mirror_id in stale:
+                    target_file_path = os.path.join(target_root, name)
+                    write_output(target_file_path, payload)
+                    outputs[mirror_id] = [target_file_path, [[key, digest]]]
+                    print(f"已写入: {source_file_path} -> {target_file_path}")
+
+                body, body_digest, line_map = merged_body(source_file_path, payload, digest, strip)
+                # 目录合并文件先写, 去重时完整内容留在目录合并文件中, 功能分类合并文件引用它
+                if dir_id in stale:
+                    if dir_merged is None:
+                        dir_merged = open(planned[dir_id][0], 'wb')
+                        dir_index = IndexWriter(dir_merged.name)
+                        outputs[dir_id] = [dir_merged.name, []]
+                    stats.write(dir_merged, f"{'='*50}\n文件: {name}\n{'='*50}\n\n")
+                    write_body(stats, dir_merged, dir_index, store, key, name,
+                               body, body_digest, source_file_path, line_map)
+                    stats.write(dir_merged, "\n\n")
+                    outputs[dir_id][1].append([key, digest])
+
+                for group_name in groups:
+                    group_id = f'group|{group_name}|{name}'
+                    if group_id in stale:
+                        group_file_path = os.path.join(target_dir, group_name, name)
+                        write_output(group_file_path, payload)
+                        outputs[group_id] = [group_file_path, [[key, digest]]]
+                        print(f"  已提取: {name} ({group_name})")
+                    merged_file = group_merged.get(group_name)
+                    if merged_file:
+                        stats.write(merged_file, "\n" + "\n".join(["=" * 80, f"文件: {name}", "=" * 80, "", ""]))
+                        write_body(stats, merged_file, group_indexes[group_name], store,
+                                   key, name, body, body_digest, source_file_path, line_map)
+                        stats.write(merged_file, "\n\n")
+                        outputs[f'group_merged|{group_name}'][1].append([key, digest])
+
+            if dir_merged is not None:
+                dir_merged.close()
+                dir_index.save()
+                print(f"已合并: {root} -> {dir_merged.name}")
+    finally:
+        for merged_file in group_merged.values():
+            merged_file.close()
+        for index in group_indexes.values():
+            index.save()
+
+    # 计划中但最终没有生成的输出 (例如全部输入都是二进制文件), 清理掉旧文件
+    for output_id in stale:
+        if output_id not in outputs and os.path.exists(planned[output_id][0]):
+            remove_output(planned[output_id][0])
+
+    for group_name, file_list in functional_groups.items():
+        for relative_file in file_list:
+            record = inputs.get(group_key(relative_file))
+            if not record or record[3] != 'text':
+                print(f"  文件不存在，跳过: {relative_file}")
+
+    save_deps(deps_path, {'version': DEPS_VERSION, 'config': config, 'inputs': inputs, 'outputs': outputs})
+
+    rebuilt = len([output_id for output_id in stale if output_id in outputs])
+    print(f"\n重新生成 {rebuilt} 个输出, 跳过 {len(planned) - len(stale)} 个未变化的输出")
+    if store:
+        store.report()
+    stats.report()
+    print("\n所有文件处理完成！")
+
+
+# 归档中合并文件所在的目录, 与 merged_dir 相对 target_dir 的默认位置一致
+ARCHIVE_MERGED_DIR = 'merged'
+
+
+def archive_name(*parts):
+    # 归档成员名: 相对输出目录、以 / 分隔, 与写入 target_dir 时的布局一致
+    return os.path.normpath(os.path.join(*parts)).replace(os.sep, '/')
+
+
+def add_merged(archive, merged_file, index):
+    # 把写好的临时合并文件及其索引追加到归档末尾
+    name = archive_name(ARCHIVE_MERGED_DIR, index.merged_path)
+    size = merged_file.tell()
+    merged_file.seek(0)
+    archive.add_file(name, merged_file, size)
+    archive.add_bytes(index_path(name), index.dumps().encode('utf-8'))
+    merged_file.close()
+
+
+def archive_convert(path_filter, archive_path, dedup=False, strip=False):
+    """归档模式: 与流式模式相同的输出布局, 但全部顺序写入一个 .tar/.tar.gz/.zip 文件。
+
+    镜像文件和分类文件在读到源文件时直接写入; 目录合并文件在该目录处理完后写入,
+    功能分类合并文件跨目录累积, 最后统一写入。不创建任何散落的输出文件。
+    """
+    file_groups = file_group_map()
+    plan, inputs = plan_dump(path_filter, {}, False)
+    stats = MergeStats()
+    store = content_store(dedup, strip)
+
+    parent = os.path.dirname(os.path.abspath(archive_path))
+    os.makedirs(parent, exist_ok=True)
+    with ArchiveWriter(archive_path) as archive:
+        group_merged = {}
+        group_indexes = {}
+        for group_name in functional_groups.keys():
+            archive.add_dir(group_name)
+            merged_file = tempfile.SpooledTemporaryFile(SPOOL_SIZE, dir=parent)
+            group_indexes[group_name] = IndexWriter(f"{group_name}_merged.txt")
+            stats.write(merged_file, '\n'.join(["=" * 80, f"{group_name} - 合并文件", "=" * 80, ""]))
+            group_merged[group_name] = merged_file
+
+        for root, relative_root, entries in plan:
+            dir_merged = None
+            for name, file, key in entries:
+                source_file_path = os.path.join(root, file)
+                kind, data, payload = read_source(source_file_path)
+                digest = source_digest(kind, data, payload)
+                inputs[key][2:] = [digest, kind]
+                if kind == 'binary':
+                    print(f"跳过二进制文件: {source_file_path}")
+                    continue
+                if kind == 'raw':
+                    archive.add_bytes(archive_name(relative_root, file), data)
+                    print(f"转换失败: {source_file_path}, 错误: 无法按 UTF-8 解码")
+                    continue
+
+                archive.add_bytes(archive_name(relative_root, name), payload)
+                body, body_digest, line_map = merged_body(source_file_path, payload, digest, strip)
+                if dir_merged is None:
+                    dir_merged = tempfile.SpooledTemporaryFile(SPOOL_SIZE, dir=parent)
+                    dir_index = IndexWriter(relative_root.replace(os.sep, '_') + '_merged.txt')
+                stats.write(dir_merged, f"{'='*50}\n文件: {name}\n{'='*50}\n\n")
+                write_body(stats, dir_merged, dir_index, store, key, name,
+                           body, body_digest, source_file_path, line_map)
+                stats.write(dir_merged, "\n\n")
+
+                for group_name in file_groups.get(key, []):
+                    archive.add_bytes(archive_name(group_name, name), payload)
+                    merged_file = group_merged[group_name]
+                    stats.write(merged_file, "\n" + "\n".join(["=" * 80, f"文件: {name}", "=" * 80, "", ""]))
+                    write_body(stats, merged_file, group_indexes[group_name], store,
+                               key, name, body, body_digest, source_file_path, line_map)
+                    stats.write(merged_file, "\n\n")
+
+            if dir_merged is not None:
+                add_merged(archive, dir_merged, dir_index)
+                print(f"已合并: {root} -> {archive_name(ARCHIVE_MERGED_DIR, dir_index.merged_path)}")
+
+        for group_name, merged_file in group_merged.items():
+            add_merged(archive, merged_file, group_indexes[group_name])
+
+    for group_name, file_list in functional_groups.items():
+        for relative_file in file_list:
+            record = inputs.get(group_key(relative_file))
+            if not record or record[3] != 'text':
+                print(f"  文件不存在，跳过: {relative_file}")
+
+    print(f"\n归档写入 {archive.members} 个文件, 共 {archive.bytes_written / (1024 * 1024):.2f} MB: {archive_path}")
+    if store:
+        store.report()
+    stats.report()
+    print("\n所有文件处理完成！")
+
+
+def pack_merged(budget, unit='tokens'):
+    """把目录合并文件中的所有文件按预算重新打包到 merged/chunks 下的编号块中。
+
+    同一功能分类的文件、循环依赖以及只被一个模块导入的模块尽量放在同一块中。
+    """
+    # 目录合并文件覆盖了所有文件, 功能分类合并文件只是其中的子集
+    group_files = {f"{group_name}_merged.txt" for group_name in functional_groups}
+    merged_files = sorted(os.path.join(merged_dir, file) for file in os.listdir(merged_dir)
+                          if file.endswith('_merged.txt') and file not in group_files)
+    groups = {group_name: [group_key(relative_file) for relative_file in file_list]
+              for group_name, file_list in functional_groups.items()}
+    graph, prefix = source_graph(source_dir)
+    return pack_dump(merged_files, os.path.join(merged_dir, CHUNK_DIR), budget, unit, groups, graph, prefix)
+
+
+def watch_dump(path_filter, polling=False, after=None, strip=False):
+    """监视源码树, 文件变化时只刷新受影响的镜像文件和合并文件, 之后调用 after (如重新打包)。
+
+    strip 须与首次生成时一致, 否则依赖记录中的配置不匹配, 会退回完整重建。
+    """
+    def relative(path):
+        rel_path = os.path.relpath(path, source_dir).replace(os.sep, '/')
+        return '' if rel_path == '.' else rel_path
+
+    def accept_dir(path):
+        rel_dir = relative(path)
+        return not rel_dir or path_filter.allowed(rel_dir, True)
+
+    def on_change(events):
+        dirty_dirs, dirty_trees = set(), set()
+        for path, is_dir in events:
+            rel_path = relative(path)
+            if rel_path.startswith('..'):
+                continue
+            if is_dir:
+                dirty_trees.add(rel_path)
+            else:
+                dirty_dirs.add(rel_path.rpartition('/')[0])
+        stream_convert(path_filter, incremental=True, dirty=(dirty_dirs, dirty_trees), strip=strip)
+        if after:
+            after()
+
+    watch(open_watcher(source_dir, accept_dir, polling), on_change)
+
+
+def configure_paths(source=None, output=None):
+    # 命令行给出的目录覆盖文件开头的默认路径
+    global source_dir, target_dir, merged_dir
+    if source:
+        source_dir = os.path.abspath(source)
+    if output:
+        target_dir = os.path.abspath(output)
+        merged_dir = os.path.join(target_dir, 'merged')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="复制源码树并转换为 txt, 按功能分类提取并合并")
+    parser.add_argument('--stream', action='store_true',
+                        help='流式模式: 每个源文件只读一次, 直接写入所有输出')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式 (隐含 --stream): 只重新生成输入有变化的输出')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help='只处理匹配的文件, 可重复指定')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='排除匹配的文件或目录, 可重复指定')
+    parser.add_argument('--no-gitignore', action='store_true',
+                        help='不应用 .gitignore 规则')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视模式 (隐含 --incremental): 持续监视源码树, 只刷新受影响的输出')
+    parser.add_argument('--poll', action='store_true',
+                        help='监视时使用轮询而不是 inotify')
+    parser.add_argument('--source', metavar='DIR', help=f'源目录 (默认: {source_dir})')
+    parser.add_argument('--output', metavar='DIR', help=f'输出目录, 合并文件写入其中的 merged (默认: {target_dir})')
+    parser.add_argument('--archive', metavar='PATH',
+                        help='归档模式: 所有输出按原布局顺序写入一个 .tar / .tar.gz / .zip 文件')
+    parser.add_argument('--dedup', action='store_true',
+                        help='合并文件按内容去重 (隐含 --stream): 重复内容写引用, 近似重复写差异')
+    parser.add_argument('--strip', action='store_true',
+                        help='精简模式 (隐含 --stream): 合并文件中的源码去掉注释和多余空行, 索引中记录行号映射')
+    parser.add_argument('--pack', type=int, metavar='BUDGET',
+                        help='按预算把合并结果重新打包为 merged/chunks 下的编号块, 并写出清单')
+    parser.add_argument('--pack-unit', choices=COST_UNITS, default='tokens',
+                        help='打包预算的单位 (默认: tokens, 按字符粗略估计)')
+    args = parser.parse_args()
+
+    if args.dedup and (args.incremental or args.watch):
+        parser.error("--dedup 的引用跨越多个合并文件, 只能完整生成, 不能与 --incremental / --watch 同时使用")
+    if args.archive and (args.incremental or args.watch):
+        parser.error("--archive 每次都完整生成, 不能与 --incremental / --watch 同时使用")
+    if args.archive and args.pack:
+        parser.error("--pack 读取合并目录中的文件, 不能与 --archive 同时使用")
+    if args.pack is not None and args.pack <= 0:
+        parser.error("--pack 的预算必须为正数")
+    if args.archive and archive_mode(args.archive) is None:
+        parser.error(f"不支持的归档格式: {args.archive}")
+    configure_paths(args.source, args.output)
+
+    path_filter = PathFilter(args.include, DEFAULT_EXCLUDES + args.exclude, not args.no_gitignore)
+    if args.archive:
+        archive_convert(path_filter, args.archive, args.dedup, args.strip)
+    elif args.stream or args.incremental or args.watch or args.dedup or args.strip:
+        stream_convert(path_filter, args.incremental or args.watch, dedup=args.dedup, strip=args.strip)
+    else:
+        convert(path_filter)
+    after = (lambda: pack_merged(args.pack, args.pack_unit)) if args.pack else None
+    if after:
+        after()
+    if args.watch:
+        watch_dump(path_filter, args.poll, after, strip=args.strip)
+
+
+if __name__ == '__main__':
+    main()
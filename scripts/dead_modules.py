@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from ets_strip import remove_comments
+from import_graph import ImportGraph, load_entries
+from resolve_imports import base_path, module_path, module_stem
+
+# 动态导入 import('...'), 以及类型位置上的 import('...').X
+DYNAMIC_IMPORT = re.compile(r'''\bimport\s*\(\s*["']([^'"\n]+)["']\s*\)''')
+# 编译产物中的 .js 后缀指向同名的 .ets/.ts 源文件
+COMPILED_SUFFIX = re.compile(r'\.js\Z')
+
+# 测试代码不会打进 HAP, 不算作死代码
+TEST_DIR = '__tests__'
+TEST_SUFFIX = '.test.ets'
+
+TOKEN = re.compile(r'[\w$]+|[^\s\w$]')
+SHINGLE_SIZE = 5
+
+
+def is_test(rel_file):
+    return TEST_DIR in rel_file.split('/') or rel_file.endswith(TEST_SUFFIX)
+
+
+def fingerprint(text):
+    """返回 (去掉注释和空白后的内容哈希, 词法单元 shingle 集合)。"""
+    tokens = TOKEN.findall(remove_comments(text)[0])
+    digest = hashlib.sha1(' '.join(tokens).encode('utf-8')).hexdigest()
+    shingles = {
+        hash(tuple(tokens[i:i + SHINGLE_SIZE]))
+        for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))
+    }
+    return digest, shingles
+
+
+def dynamic_edges(graph, rel_file):
+    # 头部之外的 import(...) 同样会在运行时加载模块
+    with open(os.path.join(graph.base_path, rel_file), 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    from_dir = os.path.dirname(rel_file)
+    targets = []
+    for match in DYNAMIC_IMPORT.finditer(text):
+        spec = COMPILED_SUFFIX.sub('', match.group(1))
+        if not spec.startswith('.'):
+            continue
+        target = graph.modules.get(module_path(spec, from_dir))
+        if target and target not in targets:
+            targets.append(target)
+    return targets
+
+
+def reachable_modules(graph, entries):
+    """从入口出发, 沿立即导入、import type 与动态导入可达的所有模块。
+
+    类型导入虽然在运行时被擦除, 但删除目标文件会导致编译失败, 因此同样视为可达。
+    """
+    seen = set(entries)
+    stack = list(entries)
+    while stack:
+        node = stack.pop()
+        graph.parse(node)
+        for target in graph.edges[node] + graph.type_edges[node] + dynamic_edges(graph, node):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def list_files(base_path):
+    files = []
+    for root, dirs, names in os.walk(base_path):
+        dirs.sort()
+        for name in sorted(names):
+            rel_dir = os.path.relpath(root, base_path).replace(os.sep, '/')
+            files.append(name if rel_dir == '.' else f'{rel_dir}/{name}')
+    return files
+
+
+def duplicate_groups(base_path, files, threshold):
+    """按内容指纹聚类: 规范化后完全相同, 或 shingle 的 Jaccard 相似度不低于 threshold。"""
+    prints = {}
+    for rel_file in files:
+        with open(os.path.join(base_path, rel_file), 'r', encoding='utf-8', errors='replace') as f:
+            prints[rel_file] = fingerprint(f.read())
+
+    parent = {rel_file: rel_file for rel_file in files}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    similarity = {}
+    by_digest = {}
+    for rel_file in files:
+        by_digest.setdefault(prints[rel_file][0], []).append(rel_file)
+    for same in by_digest.values():
+        for rel_file in same[1:]:
+            parent[find(rel_file)] = find(same[0])
+        if len(same) > 1:
+            similarity.update(dict.fromkeys(same, 1.0))
+
+    # 先用 shingle 数量做上界剪枝: |A∩B|/|A∪B| <= min/max
+    ordered = sorted(files, key=lambda rel_file: len(prints[rel_file][1]))
+    for i, a in enumerate(ordered):
+        shingles_a = prints[a][1]
+        for b in ordered[i + 1:]:
+            shingles_b = prints[b][1]
+            if len(shingles_a) < threshold * len(shingles_b):
+                break
+            if find(a) == find(b):
+                continue
+            common = len(shingles_a & shingles_b)
+            score = common / (len(shingles_a) + len(shingles_b) - common)
+            if score >= threshold:
+                parent[find(a)] = find(b)
+                similarity[a] = max(similarity.get(a, 0), score)
+                similarity[b] = max(similarity.get(b, 0), score)
+
+    clusters = {}
+    for rel_file in files:
+        clusters.setdefault(find(rel_file), []).append(rel_file)
+    return [sorted(members) for members in clusters.values() if len(members) > 1], similarity
+
+
+def analyze(graph, entries, threshold):
+    graph.parse_all()
+    reachable = reachable_modules(graph, entries)
+    modules = sorted(set(graph.modules.values()))
+    files = list_files(graph.base_path)
+    size_of = {rel_file: os.path.getsize(os.path.join(graph.base_path, rel_file)) for rel_file in files}
+
+    report = {'entries': entries, 'unreachable': [], 'stray': [], 'duplicates': []}
+    for rel_file in modules:
+        if rel_file not in reachable and not is_test(rel_file):
+            report['unreachable'].append({'file': rel_file, 'bytes': size_of[rel_file]})
+    # 非模块文件 (.backup 等) 不参与编译, 也不应留在源码目录; 跳过 .eslintrc.js 这类配置文件
+    for rel_file in files:
+        if module_stem(rel_file) is None and not rel_file.endswith('.md') and not rel_file.startswith('.'):
+            report['stray'].append({'file': rel_file, 'bytes': size_of[rel_file]})
+
+    candidates = [rel_file for rel_file in files if not rel_file.endswith('.md') and not is_test(rel_file)]
+    groups, similarity = duplicate_groups(graph.base_path, candidates, threshold)
+    for members in groups:
+        # 保留可达且最大的一份, 其余为可删除候选
+        keep = max(members, key=lambda rel_file: (rel_file in reachable, module_stem(rel_file) is not None,
+                                                   size_of[rel_file], rel_file))
+        removable = [rel_file for rel_file in members if rel_file != keep]
+        report['duplicates'].append({
+            'keep': keep,
+            'remove': [{
+                'file': rel_file,
+                'bytes': size_of[rel_file],
+                'similarity': round(similarity.get(rel_file, 0), 3),
+                'reachable': rel_file in reachable,
+            } for rel_file in removable],
+            'bytes': sum(size_of[rel_file] for rel_file in removable),
+        })
+    report['duplicates'].sort(key=lambda item: (-item['bytes'], item['keep']))
+    return report
+
+
+def print_report(report):
+    unreachable = report['unreachable']
+    print(f"\n从 {len(report['entries'])} 个入口不可达的模块 ({len(unreachable)}), "
+          f"共 {sum(item['bytes'] for item in unreachable) / 1024:.1f} KB:")
+    for item in sorted(unreachable, key=lambda item: (-item['bytes'], item['file'])):
+        print(f"  - {item['file']}: {item['bytes'] / 1024:.1f} KB")
+
+    if report['stray']:
+        print(f"\n源码目录中的非模块文件 ({len(report['stray'])}):")
+        for item in report['stray']:
+            print(f"  - {item['file']}: {item['bytes'] / 1024:.1f} KB")
+
+    duplicates = report['duplicates']
+    print(f"\n内容重复或近似的文件 ({len(duplicates)} 组), "
+          f"删除后可节省 {sum(item['bytes'] for item in duplicates) / 1024:.1f} KB:")
+    for item in duplicates:
+        print(f"  - 保留 {item['keep']}")
+        for removed in item['remove']:
+            flag = '' if not removed['reachable'] else ' (仍被引用, 需先改导入)'
+            print(f"      删除 {removed['file']}: {removed['bytes'] / 1024:.1f} KB, "
+                  f"相似度 {removed['similarity']:.0%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查找入口不可达的模块以及内容重复的文件")
+    parser.add_argument('--threshold', type=float, default=0.6,
+                        help='判定为近似重复的 Jaccard 相似度下限 (默认: 0.6)')
+    parser.add_argument('--json', metavar='PATH', help='同时把报告写成 JSON')
+    args = parser.parse_args()
+
+    graph = ImportGraph(base_path)
+    report = analyze(graph, load_entries(base_path), args.threshold)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已写入: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
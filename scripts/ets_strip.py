@@ -0,0 +1,223 @@
+import argparse
+import re
+import sys
+
+# 支持去注释的源文件后缀
+STRIP_SUFFIXES = ('.ets', '.ts', '.js', '.mjs', '.cjs')
+
+# 代码中需要停下来处理的字符: 字符串、模板字符串、注释 / 正则 / 除号、花括号
+_CODE_STOP = re.compile(r'''["'`/{}]''')
+# 模板字符串中需要停下来处理的位置: 结束的反引号、插值开始、转义
+_TEMPLATE_STOP = re.compile(r'`|\$\{|\\.', re.S)
+_STRING = {
+    "'": re.compile(r"'(?:[^'\\\n]|\\.)*'", re.S),
+    '"': re.compile(r'"(?:[^"\\\n]|\\.)*"', re.S),
+}
+_REGEX = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_TAIL_WORD = re.compile(r'[\w$]+\Z')
+# 字面量之后的 tail, 与 ) 一样表示上一个记号是一个值
+_VALUE = ')'
+# 这些关键字之后的 / 开始一个正则字面量, 而不是除号
+_REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+
+
+def _regex_allowed(tail):
+    # tail 为上一个有效代码片段 (已去掉末尾空白)
+    if not tail:
+        return True
+    last = tail[-1]
+    # 后缀 ++ / -- 之后与 ) 一样跟着一个值, / 是除号
+    if last in ')]}' or tail.endswith(('++', '--')):
+        return False
+    word = _TAIL_WORD.search(tail)
+    if word:
+        return word.group() in _REGEX_KEYWORDS
+    return True
+
+
+def remove_comments(text):
+    """单遍扫描去掉注释, 字符串、模板字符串 (含嵌套插值) 和正则字面量原样保留。
+
+    行注释删除, 单行块注释替换为空格, 跨行块注释只保留其中的换行, 因此输出与输入逐行对应。
+    返回 (输出文本, 位于多行字面量中的行, 删除过注释的行), 行号从 0 开始:
+    多行字面量中的行需原样保留 (行尾空白与空行都是内容)。
+    """
+    out = []
+    literal_ends = set()
+    literal_lines = set()
+    comment_lines = set()
+    line = 0
+    tail = ''
+    # 每层模板插值中尚未闭合的 { 数量
+    braces = []
+    in_template = False
+    pos = 0
+    size = len(text)
+
+    def emit(chunk, literal=False):
+        nonlocal line
+        newlines = chunk.count('\n')
+        if literal and newlines:
+            literal_ends.update(range(line, line + newlines))
+            literal_lines.update(range(line + 1, line + newlines + 1))
+        out.append(chunk)
+        line += newlines
+
+    while pos < size:
+        if in_template:
+            match = _TEMPLATE_STOP.search(text, pos)
+            if not match:
+                emit(text[pos:], True)
+                break
+            emit(text[pos:match.end()], True)
+            pos = match.end()
+            if match.group() == '`':
+                in_template = False
+                tail = _VALUE
+            elif match.group() == '${':
+                braces.append(0)
+                in_template = False
+                tail = '{'
+            continue
+
+        match = _CODE_STOP.search(text, pos)
+        if not match:
+            emit(text[pos:])
+            break
+        chunk = text[pos:match.start()]
+        if chunk:
+            emit(chunk)
+            if chunk.strip():
+                tail = chunk.rstrip()
+        pos = match.start()
+        char = match.group()
+
+        if char in _STRING:
+            literal = _STRING[char].match(text, pos)
+            # 未闭合的字符串到行尾为止
+            if literal:
+                end = literal.end()
+            else:
+                end = text.find('\n', pos)
+                end = size if end < 0 else end
+            emit(text[pos:end], True)
+            pos = end
+            tail = _VALUE
+        elif char == '`':
+            emit(char)
+            pos += 1
+            in_template = True
+        elif char == '{':
+            if braces:
+                braces[-1] += 1
+            emit(char)
+            pos += 1
+            tail = char
+        elif char == '}':
+            emit(char)
+            pos += 1
+            tail = char
+            if braces:
+                if braces[-1] == 0:
+                    braces.pop()
+                    in_template = True
+                else:
+                    braces[-1] -= 1
+        elif text.startswith('//', pos):
+            end = text.find('\n', pos)
+            end = size if end < 0 else end
+            comment_lines.add(line)
+            pos = end
+        elif text.startswith('/*', pos):
+            end = text.find('*/', pos + 2)
+            end = size if end < 0 else end + 2
+            newlines = text.count('\n', pos, end)
+            comment_lines.update(range(line, line + newlines + 1))
+            emit('\n' * newlines if newlines else ' ')
+            pos = end
+        else:
+            literal = _REGEX.match(text, pos) if _regex_allowed(tail) else None
+            end = literal.end() if literal else pos + 1
+            emit(text[pos:end])
+            pos = end
+            tail = _VALUE if literal else char
+
+    return ''.join(out), literal_ends, literal_lines, comment_lines
+
+
+def strip_source(text):
+    """去掉注释和行尾空白, 连续空行压缩为一行, 只剩注释的行直接删除。
+
+    返回 (输出文本, 行号映射), 行号映射第 i 项为输出第 i + 1 行对应的原始行号 (从 1 开始)。
+    """
+    code, literal_ends, literal_lines, comment_lines = remove_comments(text)
+    lines = []
+    line_map = []
+    blank = None
+    for i, line in enumerate(code.split('\n')):
+        if i not in literal_ends:
+            line = line.rstrip()
+        if not line and i not in literal_lines:
+            if i not in comment_lines and blank is None and lines:
+                blank = i
+            continue
+        if blank is not None:
+            lines.append('')
+            line_map.append(blank + 1)
+            blank = None
+        lines.append(line)
+        line_map.append(i + 1)
+    stripped = '\n'.join(lines)
+    if lines and text.endswith('\n'):
+        stripped += '\n'
+    return stripped, line_map
+
+
+def compress_line_map(line_map):
+    """行号映射压缩为 [[输出起始行, 原始起始行, 行数], ...], 连续对应的行合并为一段。"""
+    runs = []
+    for i, original in enumerate(line_map, 1):
+        if runs and runs[-1][0] + runs[-1][2] == i and runs[-1][1] + runs[-1][2] == original:
+            runs[-1][2] += 1
+        else:
+            runs.append([i, original, 1])
+    return runs
+
+
+def original_line(runs, line):
+    """按压缩后的行号映射把输出行号换算为原始行号, 超出范围时返回 None。"""
+    lo, hi = 0, len(runs)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if runs[mid][0] <= line:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == 0:
+        return None
+    start, original, count = runs[lo - 1]
+    return original + line - start if line < start + count else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="去掉 ArkTS 源文件中的注释与多余空行")
+    parser.add_argument('file', help='源文件路径')
+    parser.add_argument('--map', action='store_true', help='输出行号映射 (输出行 -> 原始行) 而不是内容')
+    args = parser.parse_args()
+
+    with open(args.file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    stripped, line_map = strip_source(text)
+    if args.map:
+        for i, original in enumerate(line_map, 1):
+            print(f"{i}\t{original}")
+        return
+    sys.stdout.write(stripped)
+    print(f"{len(text)} -> {len(stripped)} 字符, {text.count(chr(10))} -> {len(line_map)} 行", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
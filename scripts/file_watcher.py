@@ -0,0 +1,178 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify 事件掩码, 见 <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct('iIII')
+
+# 事件突发结束后等待的静默时间, 以及轮询模式的扫描间隔 (秒)
+DEBOUNCE = 0.3
+POLL_INTERVAL = 1.0
+
+
+class InotifyWatcher:
+    """通过 ctypes 调用 libc 的 inotify 递归监视目录树。
+
+    新建或移入的目录会自动加入监视; accept_dir(目录路径) 返回 False 的目录不监视。
+    事件队列溢出时返回根目录本身, 由调用方整体重新扫描。
+    """
+
+    def __init__(self, root, accept_dir=None):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify 仅在 Linux 上可用")
+        self.root = root
+        self.accept_dir = accept_dir or (lambda path: True)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.dirs = {}
+        try:
+            self.add_tree(root, strict=True)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_tree(self, top, strict=False):
+        """递归加入监视。strict 时无法监视的目录 (如 max_user_watches 超限) 抛出 OSError, 否则打印警告。"""
+        for current, dirs, _ in os.walk(top):
+            if not self.accept_dir(current):
+                dirs[:] = []
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = current
+                continue
+            code = ctypes.get_errno()
+            # 遍历期间被删除的目录不需要监视
+            if code in (errno.ENOENT, errno.ENOTDIR):
+                continue
+            if strict:
+                raise OSError(code, f"无法监视目录 {current}: {os.strerror(code)}")
+            print(f"警告: 无法监视新目录 {current}, 其中的修改不会被发现: {os.strerror(code)}")
+
+    def wait(self, timeout=None):
+        """等待最多 timeout 秒, 返回 [(路径, 是否目录)]; 超时返回空列表。"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((self.root, True))
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            parent = self.dirs.get(wd)
+            if parent is None:
+                continue
+            path = os.path.join(parent, name) if name else parent
+            is_dir = bool(mask & (IN_ISDIR | IN_DELETE_SELF))
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                self.add_tree(path)
+            events.append((path, is_dir))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """没有 inotify 时的退路: 定期比较目录树中每个文件的 size / mtime。"""
+
+    def __init__(self, root, accept_dir=None, interval=POLL_INTERVAL):
+        self.root = root
+        self.accept_dir = accept_dir or (lambda path: True)
+        self.interval = interval
+        self.files, self.dirs = self.snapshot()
+
+    def snapshot(self):
+        files = {}
+        dirs = set()
+        for current, subdirs, names in os.walk(self.root):
+            if not self.accept_dir(current):
+                subdirs[:] = []
+                continue
+            dirs.add(current)
+            for name in names:
+                path = os.path.join(current, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files[path] = (st.st_size, st.st_mtime_ns)
+        return files, dirs
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            files, dirs = self.snapshot()
+            events = [(path, True) for path in sorted(dirs ^ self.dirs)]
+            events.extend((path, False) for path in sorted(files.keys() | self.files.keys())
+                          if files.get(path) != self.files.get(path))
+            self.files, self.dirs = files, dirs
+            if events or (deadline is not None and time.monotonic() >= deadline):
+                return events
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, accept_dir=None, polling=False):
+    """优先使用 inotify, 不可用时 (非 Linux、inotify 数量超限等) 退回轮询。"""
+    if not polling:
+        try:
+            return InotifyWatcher(root, accept_dir)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用, 改用轮询: {e}")
+    return PollingWatcher(root, accept_dir)
+
+
+def watch(watcher, callback, debounce=DEBOUNCE):
+    """持续监视, 一批事件静默 debounce 秒后把去重后的 [(路径, 是否目录)] 交给 callback。
+
+    Ctrl+C 退出。
+    """
+    print(f"\n开始监视: {watcher.root} ({type(watcher).__name__}), 按 Ctrl+C 退出")
+    try:
+        while True:
+            events = watcher.wait()
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                events.extend(more)
+            if events:
+                callback(list(dict.fromkeys(events)))
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    finally:
+        watcher.close()
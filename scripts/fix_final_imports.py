@@ -1,5 +1,4 @@
-import os
-import re
+from import_fixer import build_arg_parser, fix_tree, resolve_jobs, watch_tree
 
 # 定义最后的修复规则
 fix_rules = [
@@ -14,34 +13,28 @@ fix_rules = [
 ]
 
 base_path = "entry/src/main/ets/utils"
-fixed_count = 0
-fixed_files = []
-
-# 遍历utils目录
-for root, dirs, files in os.walk(base_path):
-    for file in files:
-        if file.endswith('.ets'):
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                original = content
-                
-                # 应用修复规则
-                for pattern, replacement in fix_rules:
-                    content = re.sub(pattern, replacement, content)
-                
-                if content != original:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    rel_path = os.path.relpath(file_path, base_path)
-                    fixed_files.append(rel_path)
-                    fixed_count += 1
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
-
-print(f"\\n总共修复了 {fixed_count} 个文件")
-if fixed_files:
-    print("\\n修复的文件列表:")
-    for f in fixed_files:
-        print(f"  - {f}")
+
+
+def main():
+    parser = build_arg_parser("修复 viewmodel 与 network 的导入路径")
+    args = parser.parse_args()
+
+    # 遍历utils目录
+    fixed_files = fix_tree(fix_rules, base_path, jobs=resolve_jobs(args.jobs),
+                           name='fix_final_imports', full=args.full,
+                           header_only=args.header_only, profile=args.profile)
+    fixed_count = len(fixed_files)
+
+    print(f"\\n总共修复了 {fixed_count} 个文件")
+    if fixed_files:
+        print("\\n修复的文件列表:")
+        for f in fixed_files:
+            print(f"  - {f}")
+
+    if args.watch:
+        watch_tree(fix_rules, base_path, name='fix_final_imports',
+                   header_only=args.header_only, polling=args.poll)
+
+
+if __name__ == '__main__':
+    main()
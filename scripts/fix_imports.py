@@ -1,5 +1,4 @@
-import os
-import re
+from import_fixer import build_arg_parser, fix_tree, resolve_jobs, watch_tree
 
 # 定义修复规则
 fix_rules = [
@@ -105,38 +104,29 @@ fix_rules = [
 ]
 
 base_path = "entry/src/main/ets/utils"
-fixed_count = 0
-fixed_files = []
 
-# 遍历所有子目录
-for root, dirs, files in os.walk(base_path):
+
+def main():
+    parser = build_arg_parser("修复 utils 子目录内部的相对导入路径")
+    args = parser.parse_args()
+
     # 跳过 __tests__ 目录
-    if '__tests__' in root:
-        continue
-    for file in files:
-        if file.endswith('.ets'):
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                original = content
-                
-                # 应用所有修复规则
-                for pattern, replacement in fix_rules:
-                    content = re.sub(pattern, replacement, content)
-                
-                if content != original:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    rel_path = os.path.relpath(file_path, base_path)
-                    fixed_files.append(rel_path)
-                    fixed_count += 1
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+    fixed_files = fix_tree(fix_rules, base_path, skip='__tests__', jobs=resolve_jobs(args.jobs),
+                           name='fix_imports', full=args.full,
+                           header_only=args.header_only, profile=args.profile)
+    fixed_count = len(fixed_files)
+
+    print(f"\\n总共修复了 {fixed_count} 个文件")
+    print("\\n修复的文件列表:")
+    for f in fixed_files[:20]:  # 只显示前20个
+        print(f"  - {f}")
+    if len(fixed_files) > 20:
+        print(f"  ... 还有 {len(fixed_files) - 20} 个文件")
+
+    if args.watch:
+        watch_tree(fix_rules, base_path, skip='__tests__', name='fix_imports',
+                   header_only=args.header_only, polling=args.poll)
+
 
-print(f"\\n总共修复了 {fixed_count} 个文件")
-print("\\n修复的文件列表:")
-for f in fixed_files[:20]:  # 只显示前20个
-    print(f"  - {f}")
-if len(fixed_files) > 20:
-    print(f"  ... 还有 {len(fixed_files) - 20} 个文件")
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
-import os
-import re
+from import_fixer import build_arg_parser, fix_tree, resolve_jobs, watch_tree
 
 # 定义修复规则 - 针对utils目录外的文件
 fix_rules = [
@@ -96,38 +95,29 @@ fix_rules = [
 ]
 
 base_path = "entry/src/main/ets"
-fixed_count = 0
-fixed_files = []
 
-# 遍历所有目录，除了utils目录
-for root, dirs, files in os.walk(base_path):
-    # 跳过utils目录
-    if 'utils' in root:
-        continue
-    for file in files:
-        if file.endswith('.ets'):
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                original = content
-                
-                # 应用所有修复规则
-                for pattern, replacement in fix_rules:
-                    content = re.sub(pattern, replacement, content)
-                
-                if content != original:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    rel_path = os.path.relpath(file_path, base_path)
-                    fixed_files.append(rel_path)
-                    fixed_count += 1
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
 
-print(f"\\n总共修复了 {fixed_count} 个文件")
-print("\\n修复的文件列表 (前30个):")
-for f in fixed_files[:30]:
-    print(f"  - {f}")
-if len(fixed_files) > 30:
-    print(f"  ... 还有 {len(fixed_files) - 30} 个文件")
+def main():
+    parser = build_arg_parser("修复 utils 目录以外文件对 utils 的导入路径")
+    args = parser.parse_args()
+
+    # 遍历所有目录，除了utils目录
+    fixed_files = fix_tree(fix_rules, base_path, skip='utils', jobs=resolve_jobs(args.jobs),
+                           name='fix_imports_outside_utils', full=args.full,
+                           header_only=args.header_only, profile=args.profile)
+    fixed_count = len(fixed_files)
+
+    print(f"\\n总共修复了 {fixed_count} 个文件")
+    print("\\n修复的文件列表 (前30个):")
+    for f in fixed_files[:30]:
+        print(f"  - {f}")
+    if len(fixed_files) > 30:
+        print(f"  ... 还有 {len(fixed_files) - 30} 个文件")
+
+    if args.watch:
+        watch_tree(fix_rules, base_path, skip='utils', name='fix_imports_outside_utils',
+                   header_only=args.header_only, polling=args.poll)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import difflib
+import os
+import re
+
+from ets_strip import remove_comments
+from import_fixer import header_statements
+from import_graph import TYPE_ONLY, ImportGraph
+from resolve_imports import SPECIFIER_PATTERN, base_path, module_path, module_stem, relative_specifier
+
+# 需要展开的桶文件 (集中 re-export 的 index.ets)
+BARRELS = [
+    "utils/index.ets",
+    "core/index.ets",
+    "components/index.ets",
+]
+
+# export { A, default as B } from './x' / export * from './x'
+EXPORT_FROM = re.compile(r'''\bexport\s+(type\s+)?(?:\{([^}]*)\}|\*)\s*from\s*["']([^"']+)["']''')
+# 模块自身定义并导出的名称
+LOCAL_EXPORT = re.compile(r'''\bexport\s+(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?'''
+                          r'''(?:class|struct|interface|enum|function\*?|const|let|var|type|namespace)\s+([\w$]+)''')
+LOCAL_EXPORT_LIST = re.compile(r'''\bexport\s+(?:type\s+)?\{([^}]*)\}(?!\s*from)''')
+
+# 通过桶文件的具名导入: import { A, B as C } from '../utils'
+IMPORT_CLAUSE = re.compile(r'''import\s+(type\s+)?\{([^}]*)\}\s*from\s*(["'])([^"']+)["']\s*(;?)\s*\Z''')
+
+
+def parse_names(clause):
+    """解析 { A, type B, C as D } 为 [(原名, 本地名, 是否仅类型)]。"""
+    names = []
+    for item in clause.split(','):
+        parts = item.split()
+        if not parts:
+            continue
+        type_only = parts[0] == 'type' and len(parts) > 1
+        if type_only:
+            parts = parts[1:]
+        source = parts[0]
+        local = parts[2] if len(parts) >= 3 and parts[1] == 'as' else source
+        names.append((source, local, type_only))
+    return names
+
+
+class BarrelResolver:
+    """沿 export ... from 链把桶文件导出的名称解析到真正定义它的模块。"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._exports = {}
+
+    def exports(self, rel_file):
+        # 返回 (具名 re-export: 名称 -> (目标文件, 原名), export * 目标列表, 本地导出名称)
+        if rel_file in self._exports:
+            return self._exports[rel_file]
+        with open(os.path.join(self.graph.base_path, rel_file), 'r', encoding='utf-8') as f:
+            text = remove_comments(f.read())[0]
+        from_dir = os.path.dirname(rel_file)
+        named, stars, local = {}, [], set()
+        for match in EXPORT_FROM.finditer(text):
+            target = self.graph.modules.get(module_path(match.group(3), from_dir))
+            if target is None:
+                continue
+            if match.group(2) is None:
+                stars.append(target)
+                continue
+            for source, exported, _ in parse_names(match.group(2)):
+                named[exported] = (target, source)
+        for match in LOCAL_EXPORT.finditer(text):
+            local.add(match.group(1))
+        for match in LOCAL_EXPORT_LIST.finditer(text):
+            local.update(exported for _, exported, _ in parse_names(match.group(1)))
+        self._exports[rel_file] = (named, stars, local)
+        return self._exports[rel_file]
+
+    def resolve(self, rel_file, name, seen=None):
+        """返回 (定义 name 的文件, 该文件中的导出名); 名称由桶文件自身定义或无法解析时返回 None。"""
+        seen = seen or set()
+        if rel_file in seen:
+            return None
+        seen.add(rel_file)
+        named, stars, local = self.exports(rel_file)
+        if name in named:
+            target, source = named[name]
+            # 目标本身又是 re-export 的 index 文件时继续展开
+            if os.path.basename(target).startswith('index.'):
+                return self.resolve(target, source, seen) or (target, source)
+            return target, source
+        if name in local:
+            return None
+        for target in stars:
+            target_named, target_stars, target_local = self.exports(target)
+            if name in target_local and not (target_named or target_stars):
+                return target, name
+            resolved = self.resolve(target, name, seen)
+            if resolved:
+                return resolved
+            if name in target_local:
+                return target, name
+        return None
+
+
+def flatten_statement(statement, from_dir, barrel, resolver):
+    """把一条经由桶文件的导入改写为直接路径导入, 返回 (新语句, 新的依赖文件列表)。"""
+    match = IMPORT_CLAUSE.match(statement)
+    statement_type, clause, quote, barrel_spec, semicolon = match.groups()
+    groups = {}
+    remaining = []
+    for source, local, type_only in parse_names(clause):
+        resolved = resolver.resolve(barrel, source)
+        if resolved is None:
+            remaining.append((source, local, type_only))
+            continue
+        target, target_name = resolved
+        groups.setdefault(target, []).append((target_name, local, type_only))
+    if not groups:
+        return statement, [barrel]
+
+    def render(names, spec):
+        lines = []
+        defaults = [local for target_name, local, _ in names if target_name == 'default']
+        named = [(target_name, local, type_only) for target_name, local, type_only in names if target_name != 'default']
+        for local in defaults:
+            lines.append(f"import {local} from {quote}{spec}{quote}{semicolon}")
+        if named:
+            items = ', '.join(
+                ('type ' if type_only else '') + (target_name if target_name == local else f'{target_name} as {local}')
+                for target_name, local, type_only in named)
+            lines.append(f"import {statement_type or ''}{{ {items} }} from {quote}{spec}{quote}{semicolon}")
+        return lines
+
+    lines = []
+    for target, names in groups.items():
+        lines.extend(render(names, relative_specifier(from_dir, module_stem(target))))
+    if remaining:
+        lines.extend(render(remaining, barrel_spec))
+    return '\n'.join(lines), list(groups) + ([barrel] if remaining else [])
+
+
+def statement_targets(statement, from_dir, graph):
+    # 与 ImportGraph.parse 一致: 只计入能解析到源码树中的相对路径
+    targets = []
+    for match in SPECIFIER_PATTERN.finditer(statement):
+        if match.group(3).startswith('.'):
+            target = graph.modules.get(module_path(match.group(3), from_dir))
+            if target is not None and target not in targets:
+                targets.append(target)
+    return targets
+
+
+def flatten_file(rel_file, graph, resolver, barrels):
+    """返回 (原文件字节, 改写后的头部, 头部结束偏移, 改写后立即加载的文件列表); 无需改写时返回 None。"""
+    with open(os.path.join(graph.base_path, rel_file), 'rb') as f:
+        data = f.read()
+    from_dir = os.path.dirname(rel_file)
+    pieces = []
+    last = 0
+    changed = False
+    # 改写后每条语句的依赖都要计入: 同一桶文件可能还被其他未能展开的语句导入
+    edges = []
+    end = 0
+    for start, end in header_statements(data):
+        statement = data[start:end].decode('utf-8')
+        targets = statement_targets(statement, from_dir, graph)
+        match = IMPORT_CLAUSE.match(statement)
+        if match and len(targets) == 1 and targets[0] in barrels:
+            flattened, targets = flatten_statement(statement, from_dir, targets[0], resolver)
+            if flattened != statement:
+                pieces.append(data[last:start].decode('utf-8'))
+                pieces.append(flattened)
+                last = end
+                changed = True
+        # import type 在编译后被擦除, 不影响运行时加载
+        if not TYPE_ONLY.match(statement):
+            edges.extend(target for target in targets if target not in edges)
+    if not changed:
+        return None
+    pieces.append(data[last:end].decode('utf-8'))
+    return data, ''.join(pieces), end, edges
+
+
+def unloaded_modules(graph, rel_file, edges):
+    # 对比改写前后该文件立即加载的模块集合
+    before = set(graph.closure(rel_file))
+    original = graph.edges[rel_file]
+    graph.edges[rel_file] = edges
+    try:
+        after = set(graph.closure(rel_file))
+    finally:
+        graph.edges[rel_file] = original
+    return sorted(before - after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把经由 index.ets 桶文件的导入改写为直接路径导入")
+    parser.add_argument('--dry-run', action='store_true', help='只输出 diff 和报告, 不写回文件')
+    parser.add_argument('--barrel', action='append', default=[], metavar='PATH',
+                        help='额外需要展开的桶文件 (相对 ets 目录), 可重复指定')
+    args = parser.parse_args()
+
+    graph = ImportGraph(base_path)
+    graph.parse_all()
+    resolver = BarrelResolver(graph)
+    barrels = {barrel for barrel in BARRELS + args.barrel if os.path.isfile(os.path.join(base_path, barrel))}
+
+    fixed_files = []
+    for rel_file in sorted(graph.edges):
+        if not rel_file.endswith('.ets') or rel_file in barrels:
+            continue
+        try:
+            result = flatten_file(rel_file, graph, resolver, barrels)
+        except Exception as e:
+            print(f"Error processing {rel_file}: {e}")
+            continue
+        if result is None:
+            continue
+        data, header, end, edges = result
+        removed = unloaded_modules(graph, rel_file, edges)
+        fixed_files.append((rel_file, removed))
+
+        if args.dry_run:
+            # 比较整个文件, 否则头部最后一行没有换行, 会与下一行 diff 输出粘在一起
+            rest = data[end:].decode('utf-8')
+            diff = difflib.unified_diff(data.decode('utf-8').splitlines(True), (header + rest).splitlines(True),
+                                        f'a/{rel_file}', f'b/{rel_file}')
+            for line in diff:
+                print(line if line.endswith('\n') else line + '\n\\ No newline at end of file\n', end='')
+        else:
+            with open(os.path.join(base_path, rel_file), 'wb') as f:
+                f.write(header.encode('utf-8'))
+                f.write(memoryview(data)[end:])
+
+    print(f"\n{'将展开' if args.dry_run else '总共展开了'} {len(fixed_files)} 个文件的桶导入")
+    for rel_file, removed in fixed_files:
+        size = sum(graph.sizes[module][1] for module in removed)
+        print(f"  - {rel_file}: 不再加载 {len(removed)} 个模块, {size / 1024:.1f} KB")
+        for module in removed:
+            print(f"      {module}")
+
+
+if __name__ == '__main__':
+    main()
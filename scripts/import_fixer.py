@@ -0,0 +1,438 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from file_watcher import open_watcher, watch
+
+# 所有修复规则共同的前缀: from '... / from "...
+IMPORT_HEAD = r'from\s+["\']'
+
+# 增量修复清单, 各修复脚本共用, 按脚本名分节
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.import_fix_manifest.json')
+
+
+class RuleEngine:
+    """把 fix_rules 表编译成一个匹配器, 每个文件只扫描一遍。
+
+    规则按表中顺序组成一个分支, 在同一位置先声明的规则优先,
+    与原来逐条 re.sub 的结果一致(前提是替换结果不会再被后面的规则命中,
+    现有规则表都满足这一点)。
+    """
+
+    def __init__(self, fix_rules):
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in fix_rules]
+        # 不含反向引用的替换串直接返回, 不必再 expand
+        self.literal = [None if '\\' in replacement else replacement for _, replacement in fix_rules]
+
+        if all(pattern.startswith(IMPORT_HEAD) for pattern, _ in fix_rules):
+            # 提取公共前缀, 让正则引擎先用字面量 "from" 定位, 再在分支里查具体路径
+            branches = [f'(?P<r{i}>{pattern[len(IMPORT_HEAD):]})' for i, (pattern, _) in enumerate(fix_rules)]
+            self.matcher = re.compile(IMPORT_HEAD + '(?:' + '|'.join(branches) + ')')
+        else:
+            branches = [f'(?P<r{i}>{pattern})' for i, (pattern, _) in enumerate(fix_rules)]
+            self.matcher = re.compile('|'.join(branches))
+
+    def _replace(self, match):
+        index = int(match.lastgroup[1:])
+        text = match.group()
+        if self.literal[index] is not None:
+            return self.literal[index]
+        rule, replacement = self.rules[index]
+        return rule.match(text).expand(replacement)
+
+    def apply(self, content):
+        return self.matcher.sub(self._replace, content)
+
+    def profile(self, content):
+        """apply 的统计版本, 返回 (结果, 统计)。
+
+        统计为 (规则序号 -> 命中次数, 每条规则单独扫描全文的耗时, 合并匹配器的替换耗时);
+        单独扫描耗时即该规则放在逐条 re.sub 循环中的开销, 用来评估删掉它的收益。
+        """
+        hits = {}
+
+        def replace(match):
+            index = int(match.lastgroup[1:])
+            hits[index] = hits.get(index, 0) + 1
+            return self._replace(match)
+
+        start = time.perf_counter()
+        result = self.matcher.sub(replace, content)
+        elapsed = time.perf_counter() - start
+        seconds = []
+        for rule, _ in self.rules:
+            start = time.perf_counter()
+            for _ in rule.finditer(content):
+                pass
+            seconds.append(time.perf_counter() - start)
+        return result, (hits, seconds, elapsed)
+
+    def run(self, content, profile=False):
+        # 返回 (结果, 统计), 非统计模式下统计为 None
+        if profile:
+            return self.profile(content)
+        return self.apply(content), None
+
+
+# 文件头部的空白和注释
+_HEADER_GAP = re.compile(rb'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.S)
+
+# 头部允许出现的语句: import / export ... from, 可以跨多行
+# 旧规则会生成引号不配对的路径 (from "../x'), 这里两种引号都接受
+_MODULE_SPECIFIER = rb"""["'][^'"\n]*["']"""
+_HEADER_STATEMENT = re.compile(rb"""
+    (?:
+        import\s*""" + _MODULE_SPECIFIER + rb"""
+      | import\b[^'"`;()=]*?\bfrom\s*""" + _MODULE_SPECIFIER + rb"""
+      | export\s+(?:type\s+)?(?:\{[^}'"`;]*\}|\*(?:\s*as\s+[\w$]+)?)\s*from\s*""" + _MODULE_SPECIFIER + rb"""
+    )[ \t]*;?
+""", re.X)
+
+_UTF8_BOM = b'\xef\xbb\xbf'
+
+
+def header_statements(data):
+    """依次返回文件开头每条 import/export-from 语句的 (起始, 结束) 字节偏移。
+
+    跳过语句之间的空白和注释, 遇到第一条其他语句即停止, 之后的内容不再扫描。
+    """
+    pos = len(_UTF8_BOM) if data.startswith(_UTF8_BOM) else 0
+    while True:
+        pos = _HEADER_GAP.match(data, pos).end()
+        match = _HEADER_STATEMENT.match(data, pos)
+        if not match:
+            return
+        yield match.start(), match.end()
+        pos = match.end()
+
+
+def import_header_end(data):
+    """返回文件开头 import/export-from 区域结束处的字节偏移。"""
+    end = len(_UTF8_BOM) if data.startswith(_UTF8_BOM) else 0
+    for _, end in header_statements(data):
+        pass
+    return end
+
+
+# 进程池中每个 worker 各自持有一份编译好的规则
+_worker_engine = None
+_worker_header_only = False
+_worker_profile = False
+
+
+def _init_worker(fix_rules, header_only=False, profile=False):
+    global _worker_engine, _worker_header_only, _worker_profile
+    _worker_engine = RuleEngine(fix_rules)
+    _worker_header_only = header_only
+    _worker_profile = profile
+
+
+def _fix_file(file_path, known_digest=None, engine=None, header_only=None, profile=None):
+    # 返回 (是否修改, 错误信息, 清单记录, 规则统计), 输出统一由主进程按顺序打印
+    engine = engine or _worker_engine
+    if header_only is None:
+        header_only = _worker_header_only
+    if profile is None:
+        profile = _worker_profile
+    try:
+        if header_only:
+            return _fix_header(file_path, known_digest, engine, profile)
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        digest = content_digest(content)
+        stats = None
+
+        # 内容与上次处理后一致且规则未变, 无需再套用规则
+        if digest != known_digest:
+            original = content
+
+            # 一次扫描应用所有修复规则
+            content, stats = engine.run(content, profile)
+
+            if content != original:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                return True, None, _manifest_record(file_path, content_digest(content)), stats
+        return False, None, _manifest_record(file_path, digest), stats
+    except Exception as e:
+        return False, f"Error processing {file_path}: {e}", None, None
+
+
+def _fix_header(file_path, known_digest, engine, profile=False):
+    # 只解码并改写头部, 正文以 memoryview 原样写回, 不做解码和拷贝
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    stats = None
+
+    if digest != known_digest:
+        end = import_header_end(data)
+        header = data[:end].decode('utf-8')
+        fixed_header, stats = engine.run(header, profile)
+
+        if fixed_header != header:
+            fixed_bytes = fixed_header.encode('utf-8')
+            body = memoryview(data)[end:]
+            with open(file_path, 'wb') as f:
+                f.write(fixed_bytes)
+                f.write(body)
+            sha1 = hashlib.sha1(fixed_bytes)
+            sha1.update(body)
+            return True, None, _manifest_record(file_path, sha1.hexdigest()), stats
+    return False, None, _manifest_record(file_path, digest), stats
+
+
+def content_digest(content):
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def rules_digest(fix_rules):
+    return hashlib.sha1(repr(fix_rules).encode('utf-8')).hexdigest()
+
+
+def _manifest_record(file_path, digest):
+    st = os.stat(file_path)
+    return [st.st_size, st.st_mtime_ns, digest]
+
+
+class Manifest:
+    """增量修复清单, 记录每个文件处理后的 size / mtime / 内容哈希以及规则表哈希。
+
+    每个修复脚本在清单中占一节, 互不影响; 文件不存在或损坏时视为空清单。
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def section(self, name):
+        return self.data.get(name, {})
+
+    def update(self, name, rules_hash, files):
+        self.data[name] = {'rules': rules_hash, 'files': files}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class RuleProfile:
+    """--profile 模式下汇总每条规则的命中次数、命中文件和扫描耗时。"""
+
+    def __init__(self, fix_rules):
+        self.fix_rules = fix_rules
+        self.hits = [0] * len(fix_rules)
+        self.files = [{} for _ in fix_rules]
+        self.seconds = [0.0] * len(fix_rules)
+        self.engine_seconds = 0.0
+        self.scanned = 0
+
+    def add(self, rel_path, stats):
+        hits, seconds, elapsed = stats
+        self.scanned += 1
+        self.engine_seconds += elapsed
+        for index, count in hits.items():
+            self.hits[index] += count
+            self.files[index][rel_path] = count
+        for index, elapsed in enumerate(seconds):
+            self.seconds[index] += elapsed
+
+    def order(self):
+        # 命中多的在前, 命中次数相同时单独扫描耗时高的在前
+        return sorted(range(len(self.fix_rules)), key=lambda i: (-self.hits[i], -self.seconds[i], i))
+
+    def to_json(self):
+        return {
+            'files_scanned': self.scanned,
+            'engine_seconds': self.engine_seconds,
+            'rule_seconds': sum(self.seconds),
+            'rules': [{
+                'index': i,
+                'pattern': self.fix_rules[i][0],
+                'replacement': self.fix_rules[i][1],
+                'hits': self.hits[i],
+                'seconds': self.seconds[i],
+                'files': dict(sorted(self.files[i].items())),
+            } for i in self.order()],
+            'never_matched': [i for i in range(len(self.fix_rules)) if not self.hits[i]],
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
+
+    def print_table(self):
+        print(f"\n规则统计: 扫描 {self.scanned} 个文件, 合并匹配器用时 {self.engine_seconds * 1000:.1f} ms, "
+              f"逐条扫描合计 {sum(self.seconds) * 1000:.1f} ms")
+        print(f"  {'序号':>4} {'命中':>6} {'文件':>5} {'耗时ms':>8}  规则")
+        for i in self.order():
+            print(f"  {i:>4} {self.hits[i]:>6} {len(self.files[i]):>5} {self.seconds[i] * 1000:>8.2f}  {self.fix_rules[i][0]}")
+        never = [i for i in range(len(self.fix_rules)) if not self.hits[i]]
+        if never:
+            print(f"\n从未命中的规则 ({len(never)}/{len(self.fix_rules)}), "
+                  f"逐条扫描合计 {sum(self.seconds[i] for i in never) * 1000:.1f} ms:")
+            for i in never:
+                print(f"  - {i}: {self.fix_rules[i][0]}")
+
+
+def collect_files(base_path, skip=None):
+    # 按 os.walk 的顺序收集 .ets 文件, skip 为需要跳过的目录名片段
+    file_paths = []
+    for root, dirs, files in os.walk(base_path):
+        if skip and skip in root:
+            continue
+        for file in files:
+            if file.endswith('.ets'):
+                file_paths.append(os.path.join(root, file))
+    return file_paths
+
+
+def fix_tree(fix_rules, base_path, skip=None, jobs=1, name=None, full=False, header_only=False, profile=None):
+    """修复 base_path 下所有 .ets 文件, 返回被修改文件的相对路径列表。
+
+    jobs > 1 时按块分发给进程池; 结果按遍历顺序合并, 与 worker 数量无关。
+    给出 name 时启用增量模式: 规则表和文件 size/mtime 都未变化的文件直接跳过,
+    不再读取; full=True 时忽略清单全部重新处理。
+    header_only=True 时只改写文件开头的 import/export 区域。
+    给出 profile (JSON 路径) 时统计每条规则的命中与耗时, 打印表格并写出 JSON;
+    统计需要扫描所有文件, 因此隐含 full=True。
+    """
+    file_paths = collect_files(base_path, skip)
+    if profile is True:
+        profile = f'{name or "fix_tree"}_profile.json'
+
+    manifest = Manifest() if name else None
+    # 扫描范围不同结果也可能不同, 一并计入规则哈希
+    rules_hash = rules_digest(fix_rules) + (':header' if header_only else '')
+    previous = {}
+    if manifest and not full and not profile:
+        section = manifest.section(name)
+        if section.get('rules') == rules_hash:
+            previous = section.get('files', {})
+
+    records = {}
+    pending = []
+    for file_path in file_paths:
+        rel_path = os.path.relpath(file_path, base_path)
+        record = previous.get(rel_path)
+        if record:
+            st = os.stat(file_path)
+            if record[0] == st.st_size and record[1] == st.st_mtime_ns:
+                records[rel_path] = record
+                continue
+        pending.append((file_path, record[2] if record else None))
+
+    paths = [file_path for file_path, _ in pending]
+    digests = [digest for _, digest in pending]
+    if jobs > 1 and len(pending) > 1:
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(fix_rules, header_only, bool(profile))) as executor:
+            results = list(executor.map(_fix_file, paths, digests, chunksize=chunksize))
+    else:
+        engine = RuleEngine(fix_rules)
+        results = [_fix_file(file_path, digest, engine, header_only, bool(profile)) for file_path, digest in pending]
+
+    rule_profile = RuleProfile(fix_rules) if profile else None
+    fixed_files = []
+    for file_path, (changed, error, record, stats) in zip(paths, results):
+        rel_path = os.path.relpath(file_path, base_path)
+        if error:
+            print(error)
+            continue
+        records[rel_path] = record
+        if changed:
+            fixed_files.append(rel_path)
+        if rule_profile and stats:
+            rule_profile.add(rel_path, stats)
+
+    if rule_profile:
+        rule_profile.print_table()
+        rule_profile.save(profile)
+        print(f"\n规则统计已写入: {profile}")
+
+    if manifest:
+        manifest.update(name, rules_hash, records)
+        manifest.save()
+    return fixed_files
+
+
+def watch_tree(fix_rules, base_path, skip=None, name=None, header_only=False, polling=False):
+    """持续监视 base_path, 只对新增、修改或移入的 .ets 文件重新套用规则。
+
+    清单记录与 fix_tree 共用: 本脚本写回文件触发的事件因内容哈希未变而直接跳过。
+    """
+    engine = RuleEngine(fix_rules)
+    manifest = Manifest() if name else None
+    rules_hash = rules_digest(fix_rules) + (':header' if header_only else '')
+    records = {}
+    if manifest and manifest.section(name).get('rules') == rules_hash:
+        records = dict(manifest.section(name).get('files', {}))
+
+    def accept_dir(path):
+        return not (skip and skip in path)
+
+    def on_change(events):
+        paths = []
+        for path, is_dir in events:
+            if is_dir:
+                # 新建或移入的目录整体扫描一遍
+                if os.path.isdir(path) and accept_dir(path):
+                    paths.extend(collect_files(path, skip))
+            elif path.endswith('.ets') and accept_dir(os.path.dirname(path)):
+                paths.append(path)
+
+        fixed_files = []
+        for file_path in dict.fromkeys(paths):
+            rel_path = os.path.relpath(file_path, base_path)
+            if not os.path.isfile(file_path):
+                records.pop(rel_path, None)
+                continue
+            record = records.get(rel_path)
+            changed, error, record, _ = _fix_file(file_path, record[2] if record else None, engine, header_only, False)
+            if error:
+                print(error)
+                continue
+            records[rel_path] = record
+            if changed:
+                fixed_files.append(rel_path)
+
+        if manifest:
+            manifest.update(name, rules_hash, records)
+            manifest.save()
+        for rel_path in fixed_files:
+            print(f"已修复: {rel_path}")
+
+    watch(open_watcher(base_path, accept_dir, polling), on_change)
+
+
+def build_arg_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='并行进程数, 0 表示使用全部 CPU 核心 (默认: 1)')
+    parser.add_argument('--full', action='store_true',
+                        help='忽略增量清单, 重新处理所有文件')
+    parser.add_argument('--header-only', action='store_true',
+                        help='只扫描文件开头的 import/export 区域, 不扫描正文')
+    parser.add_argument('--profile', nargs='?', const=True, metavar='PATH',
+                        help='统计每条规则的命中次数与耗时, 写出 JSON (默认: <脚本名>_profile.json)')
+    parser.add_argument('--watch', action='store_true',
+                        help='处理完成后持续监视目录, 文件变化时只修复变化的文件')
+    parser.add_argument('--poll', action='store_true',
+                        help='监视时使用轮询而不是 inotify')
+    return parser
+
+
+def resolve_jobs(jobs):
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
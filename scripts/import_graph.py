@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import re
+from collections import deque
+
+from import_fixer import header_statements
+from resolve_imports import SPECIFIER_PATTERN, base_path, build_index, module_path
+
+# 应用入口与页面路由配置
+ENTRY_ABILITY = "entryability/EntryAbility.ets"
+MAIN_PAGES = "entry/src/main/resources/base/profile/main_pages.json"
+
+# import type / export type 在编译后被擦除, 不会在运行时加载模块
+TYPE_ONLY = re.compile(r'(?:import|export)\s+type\b')
+
+
+def load_entries(base_path, main_pages=MAIN_PAGES):
+    """返回入口文件列表: EntryAbility 以及 main_pages.json 中的每个路由页面。"""
+    entries = [ENTRY_ABILITY]
+    try:
+        with open(main_pages, 'r', encoding='utf-8') as f:
+            routes = json.load(f).get('src', [])
+    except (OSError, ValueError) as e:
+        print(f"读取路由配置失败: {main_pages}, 错误: {e}")
+        routes = []
+    for route in routes:
+        entries.append(route + '.ets')
+    return [entry for entry in entries if os.path.isfile(os.path.join(base_path, entry))]
+
+
+class ImportGraph:
+    """源码树的模块依赖图, 节点为相对 base_path 的文件路径。
+
+    只解析文件开头的 import/export-from 语句, 与修复脚本使用同一套头部扫描。
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.index, self.modules = build_index(base_path)
+        self.edges = {}
+        self.type_edges = {}
+        self.sizes = {}
+        self.unresolved = []
+
+    def parse(self, rel_file):
+        if rel_file in self.edges:
+            return
+        with open(os.path.join(self.base_path, rel_file), 'rb') as f:
+            data = f.read()
+        self.sizes[rel_file] = (data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0), len(data))
+
+        from_dir = os.path.dirname(rel_file)
+        eager, type_only = [], []
+        for start, end in header_statements(data):
+            statement = data[start:end].decode('utf-8', errors='replace')
+            for match in SPECIFIER_PATTERN.finditer(statement):
+                spec = match.group(3)
+                if not spec.startswith('.'):
+                    continue
+                target = self.modules.get(module_path(spec, from_dir))
+                if target is None:
+                    self.unresolved.append((rel_file, spec))
+                    continue
+                targets = type_only if TYPE_ONLY.match(statement) else eager
+                if target not in targets:
+                    targets.append(target)
+        self.edges[rel_file] = eager
+        self.type_edges[rel_file] = type_only
+
+    def parse_all(self):
+        for rel_file in sorted(set(self.modules.values())):
+            self.parse(rel_file)
+
+    def closure(self, start):
+        """从 start 出发立即加载的所有模块 (含自身), 按广度优先顺序返回。"""
+        seen = {start}
+        order = [start]
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            self.parse(node)
+            for target in self.edges[node]:
+                if target not in seen:
+                    seen.add(target)
+                    order.append(target)
+                    queue.append(target)
+        return order
+
+    def totals(self, modules):
+        lines = sum(self.sizes[module][0] for module in modules)
+        size = sum(self.sizes[module][1] for module in modules)
+        return lines, size
+
+    def cycles(self, nodes):
+        """Tarjan 强连通分量, 返回 nodes 范围内的所有循环依赖 (含自引用)。"""
+        nodes = set(nodes)
+        index_of, low, stack, on_stack = {}, {}, [], set()
+        result = []
+        counter = [0]
+
+        def visit(root):
+            # 迭代实现, 避免深依赖链触发递归上限
+            work = [(root, 0)]
+            index_of[root] = low[root] = counter[0]
+            counter[0] += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, i = work[-1]
+                targets = [t for t in self.edges[node] if t in nodes]
+                if i < len(targets):
+                    work[-1] = (node, i + 1)
+                    target = targets[i]
+                    if target not in index_of:
+                        index_of[target] = low[target] = counter[0]
+                        counter[0] += 1
+                        stack.append(target)
+                        on_stack.add(target)
+                        work.append((target, 0))
+                    elif target in on_stack:
+                        low[node] = min(low[node], index_of[target])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.edges[node]:
+                        result.append(sorted(component))
+
+        for node in sorted(nodes):
+            if node not in index_of:
+                visit(node)
+        return sorted(result)
+
+
+def analyze(graph, entries, top):
+    report = {'entries': [], 'heaviest': [], 'cycles': [], 'unresolved': []}
+    reachable = set()
+    loaded_by = {}
+    for entry in entries:
+        modules = graph.closure(entry)
+        reachable.update(modules)
+        for module in modules:
+            loaded_by.setdefault(module, []).append(entry)
+        lines, size = graph.totals(modules)
+        report['entries'].append({
+            'entry': entry,
+            'modules': len(modules),
+            'lines': lines,
+            'bytes': size,
+            'cycles': len(graph.cycles(modules)),
+        })
+
+    # 每个被加载的模块自身引出的子树越重, 改为延迟加载的收益越大
+    subtrees = []
+    for module in reachable - set(entries):
+        modules = graph.closure(module)
+        lines, size = graph.totals(modules)
+        subtrees.append({
+            'module': module,
+            'own_bytes': graph.sizes[module][1],
+            'modules': len(modules),
+            'lines': lines,
+            'bytes': size,
+            'loaded_by': sorted(loaded_by[module]),
+        })
+    subtrees.sort(key=lambda item: (-item['bytes'], item['module']))
+    report['heaviest'] = subtrees[:top]
+    report['cycles'] = graph.cycles(reachable)
+    report['unresolved'] = [{'file': f, 'import': spec} for f, spec in graph.unresolved if f in reachable]
+    return report
+
+
+def print_report(report):
+    print("\n各入口启动时立即加载的模块:")
+    for item in report['entries']:
+        print(f"  - {item['entry']}: {item['modules']} 个模块, {item['lines']} 行, "
+              f"{item['bytes'] / 1024:.1f} KB, 循环依赖 {item['cycles']} 组")
+
+    print("\n最重的依赖子树 (延迟加载候选):")
+    for item in report['heaviest']:
+        print(f"  - {item['module']}: 子树 {item['modules']} 个模块, {item['lines']} 行, "
+              f"{item['bytes'] / 1024:.1f} KB (自身 {item['own_bytes'] / 1024:.1f} KB), "
+              f"被 {len(item['loaded_by'])} 个入口加载")
+
+    if report['cycles']:
+        print(f"\n循环依赖 ({len(report['cycles'])} 组):")
+        for component in report['cycles']:
+            print(f"  - {' <-> '.join(component)}")
+
+    if report['unresolved']:
+        print(f"\n无法解析的导入 ({len(report['unresolved'])}):")
+        for item in report['unresolved']:
+            print(f"  - {item['file']}: {item['import']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析各页面启动时立即加载的模块依赖")
+    parser.add_argument('--top', type=int, default=15, help='列出最重的子树数量 (默认: 15)')
+    parser.add_argument('--json', metavar='PATH', help='同时把报告写成 JSON')
+    args = parser.parse_args()
+
+    graph = ImportGraph(base_path)
+    report = analyze(graph, load_entries(base_path), args.top)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已写入: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
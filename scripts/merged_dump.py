@@ -0,0 +1,315 @@
+import argparse
+import difflib
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+
+from ets_strip import original_line
+
+# 合并文件旁边的索引文件后缀
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 2
+# 版本 2 增加了去重条目 (dedup / base 字段), 版本 1 的索引仍可读取
+READABLE_VERSIONS = (1, 2)
+
+# 近似重复检测: bottom-k MinHash 草图大小、每个 shingle 包含的行数、判定阈值
+SKETCH_SIZE = 64
+SHINGLE_LINES = 3
+NEAR_THRESHOLD = 0.5
+# 小于该大小的文件不做近似重复检测; 差异超过原文该比例时仍写完整内容
+MIN_NEAR_SIZE = 1024
+MAX_DIFF_RATIO = 0.5
+DIFF_CONTEXT = 2
+
+_LINE = re.compile(r'[^\n]*\n|[^\n]+')
+_HUNK = re.compile(r'@@ -(\d+)(?:,(\d+))? \+')
+NO_NEWLINE = '\\ No newline at end of file\n'
+
+
+def index_path(merged_path):
+    return merged_path + INDEX_SUFFIX
+
+
+def file_digest(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class IndexWriter:
+    """记录合并文件中每个文件正文的字节偏移、长度和 SHA-1, 写成 JSON 索引。"""
+
+    def __init__(self, merged_path):
+        self.merged_path = merged_path
+        self.files = []
+
+    def add(self, path, name, offset, length, digest, dedup=None, base=None, line_map=None):
+        # dedup 为 'ref' / 'diff' 时, offset/length 指向差异正文 (引用为空), base 为规范副本位置;
+        # line_map 为精简模式下压缩后的行号映射 (见 ets_strip.compress_line_map)
+        entry = {
+            'path': path.replace(os.sep, '/'),
+            'name': name,
+            'offset': offset,
+            'length': length,
+            'sha1': digest,
+        }
+        if dedup:
+            entry['dedup'] = dedup
+            entry['base'] = base
+        if line_map is not None:
+            entry['line_map'] = line_map
+        self.files.append(entry)
+
+    def dumps(self):
+        data = {
+            'version': INDEX_VERSION,
+            'merged': os.path.basename(self.merged_path),
+            'files': self.files,
+        }
+        return json.dumps(data, ensure_ascii=False, indent=1)
+
+    def save(self):
+        with open(index_path(self.merged_path), 'w', encoding='utf-8') as f:
+            f.write(self.dumps())
+
+
+def split_lines(text):
+    # 只按 \n 切分并保留行尾, \r 等字符留在行内
+    return _LINE.findall(text)
+
+
+def line_sketch(text, size=SKETCH_SIZE):
+    """以连续 SHINGLE_LINES 个非空行 (去掉缩进) 为 shingle, 返回 bottom-k MinHash 草图。"""
+    lines = [line for line in (line.strip() for line in text.split('\n')) if line]
+    shingles = {
+        int.from_bytes(hashlib.blake2b('\n'.join(lines[i:i + SHINGLE_LINES]).encode('utf-8'),
+                                       digest_size=8).digest(), 'big')
+        for i in range(max(len(lines) - SHINGLE_LINES + 1, 1))
+    }
+    return frozenset(heapq.nsmallest(size, shingles))
+
+
+def estimate_similarity(a, b, size=SKETCH_SIZE):
+    # 并集中最小的 size 个值里两边都有的比例, 即 Jaccard 相似度的估计
+    union = heapq.nsmallest(size, a | b)
+    return sum(1 for value in union if value in a and value in b) / max(len(union), 1)
+
+
+def make_diff(base, text, context=DIFF_CONTEXT):
+    """base -> text 的 unified diff (不含文件头), 末行没有换行符时按 diff 惯例标注。"""
+    lines = []
+    diff = difflib.unified_diff(split_lines(base), split_lines(text), n=context)
+    for i, line in enumerate(diff):
+        if i < 2:
+            continue
+        if line.endswith('\n'):
+            lines.append(line)
+        else:
+            lines.append(line + '\n' + NO_NEWLINE)
+    return ''.join(lines)
+
+
+def apply_diff(base, diff):
+    """把 make_diff 生成的差异应用到 base 上。"""
+    base_lines = split_lines(base)
+    out = []
+    pos = 0
+    last = None
+    for line in split_lines(diff):
+        if line.startswith('@@'):
+            match = _HUNK.match(line)
+            start = int(match.group(1))
+            # 长度为 0 的区间给出的是插入位置之前的行号
+            if match.group(2) != '0':
+                start -= 1
+            out.extend(base_lines[pos:start])
+            pos = start
+        elif line == NO_NEWLINE:
+            if last == '+':
+                out[-1] = out[-1][:-1]
+        elif line[0] == ' ':
+            out.append(base_lines[pos])
+            pos += 1
+        elif line[0] == '-':
+            pos += 1
+        elif line[0] == '+':
+            out.append(line[1:])
+        last = line[0]
+    out.extend(base_lines[pos:])
+    return ''.join(out)
+
+
+class ContentStore:
+    """合并文件按内容去重: 相同内容 (SHA-1 相同) 只完整写入一次, 之后写引用;
+    与已写入的某个副本近似 (行 shingle 的 MinHash 估计相似度不低于阈值) 时写相对它的差异。
+
+    load(source) 用于重新读取规范副本的内容, 这样不需要把所有正文留在内存中。
+    """
+
+    def __init__(self, load, near=True, threshold=NEAR_THRESHOLD):
+        self.load = load
+        self.near = near
+        self.threshold = threshold
+        self.locations = {}
+        self.bases = []
+        self.postings = {}
+        self.refs = 0
+        self.diffs = 0
+        self.saved = 0
+
+    def place(self, merged, path, payload, digest, source):
+        """返回 None 表示应写入完整内容 (并登记为规范副本), 否则返回 (dedup, base, 说明行, 正文)。"""
+        location = self.locations.get(digest)
+        if location:
+            self.refs += 1
+            self.saved += len(payload)
+            note = f"[重复: 内容与 {location['merged']} 中的 {location['path']} 相同]\n"
+            return 'ref', location, note, b''
+
+        location = {'merged': os.path.basename(merged), 'path': path.replace(os.sep, '/')}
+        self.locations[digest] = location
+        if not self.near or len(payload) < MIN_NEAR_SIZE:
+            return None
+        text = payload.decode('utf-8')
+        sketch = line_sketch(text)
+        placed = self._diff(text, sketch, len(payload))
+        if placed:
+            return placed
+        base_id = len(self.bases)
+        self.bases.append((location, digest, source, sketch))
+        for value in sketch:
+            self.postings.setdefault(value, []).append(base_id)
+        return None
+
+    def _diff(self, text, sketch, size):
+        shared = Counter(base_id for value in sketch for base_id in self.postings.get(value, ()))
+        for base_id, _ in shared.most_common(3):
+            location, digest, source, base_sketch = self.bases[base_id]
+            score = estimate_similarity(sketch, base_sketch)
+            if score < self.threshold:
+                continue
+            base = self.load(source)
+            # 规范副本在本次运行中被修改过时不能作为差异的基准
+            if hashlib.sha1(base).hexdigest() != digest:
+                continue
+            base = base.decode('utf-8')
+            diff = make_diff(base, text)
+            body = diff.encode('utf-8')
+            if len(body) > size * MAX_DIFF_RATIO or apply_diff(base, diff) != text:
+                continue
+            self.diffs += 1
+            self.saved += size - len(body)
+            note = f"[近似重复: 以下为相对 {location['merged']} 中的 {location['path']} 的差异, 相似度约 {score:.2f}]\n"
+            return 'diff', location, note, body
+        return None
+
+    def report(self):
+        print(f"去重: {self.refs} 处重复改为引用, {self.diffs} 处近似重复改为差异, "
+              f"节省 {self.saved / (1024 * 1024):.2f} MB")
+
+
+class MergedDump:
+    """按索引读取合并文件中的单个文件, 通过 mmap 直接定位, 不需要从头扫描。
+
+    去重条目会到同目录下的其他合并文件中取出规范副本, 再按需应用差异。
+
+    用法:
+        with MergedDump('merged/ets_pages_merged.txt') as dump:
+            text = dump.read('ets/pages/MainPage.ets')
+    """
+
+    def __init__(self, merged_path):
+        self.merged_path = merged_path
+        with open(index_path(merged_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') not in READABLE_VERSIONS:
+            raise ValueError(f"不支持的索引版本: {data.get('version')}")
+        self.entries = {entry['path']: entry for entry in data['files']}
+        self._file = open(merged_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件无法 mmap
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._siblings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def paths(self):
+        return list(self.entries)
+
+    def sibling(self, merged):
+        if merged == os.path.basename(self.merged_path):
+            return self
+        if merged not in self._siblings:
+            self._siblings[merged] = MergedDump(os.path.join(os.path.dirname(self.merged_path), merged))
+        return self._siblings[merged]
+
+    def read_bytes(self, path):
+        entry = self.entries[path]
+        data = self._map[entry['offset']:entry['offset'] + entry['length']]
+        dedup = entry.get('dedup')
+        if not dedup:
+            return data
+        base = self.sibling(entry['base']['merged']).read_bytes(entry['base']['path'])
+        if dedup == 'ref':
+            return base
+        return apply_diff(base.decode('utf-8'), data.decode('utf-8')).encode('utf-8')
+
+    def read(self, path):
+        return self.read_bytes(path).decode('utf-8')
+
+    def original_line(self, path, line):
+        """精简模式下把正文中的行号 (从 1 开始) 换算为源文件中的行号, 未精简的文件原样返回。"""
+        runs = self.entries[path].get('line_map')
+        return line if runs is None else original_line(runs, line)
+
+    def verify(self, path):
+        return hashlib.sha1(self.read_bytes(path)).hexdigest() == self.entries[path]['sha1']
+
+    def close(self):
+        for dump in self._siblings.values():
+            dump.close()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从合并文件中按索引取出单个文件")
+    parser.add_argument('merged', help='合并文件路径 (*_merged.txt)')
+    parser.add_argument('path', nargs='?', help='原始文件路径, 省略时列出所有文件')
+    parser.add_argument('--line', type=int, help='精简模式下把正文中的行号换算为源文件中的行号')
+    args = parser.parse_args()
+
+    with MergedDump(args.merged) as dump:
+        if not args.path:
+            for path, entry in dump.entries.items():
+                line = f"{entry['offset']:>10} {entry['length']:>8}  {path}"
+                if entry.get('dedup'):
+                    line += f"  -> {entry['base']['merged']}: {entry['base']['path']} ({entry['dedup']})"
+                print(line)
+            return
+        if args.path not in dump:
+            print(f"索引中没有该文件: {args.path}")
+            sys.exit(1)
+        if args.line:
+            print(dump.original_line(args.path, args.line))
+            return
+        sys.stdout.buffer.write(dump.read_bytes(args.path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import codecs
+import os
+import re
+
+# 嗅探二进制内容时读取的字节数
+SNIFF_SIZE = 8192
+
+# 构建产物和依赖目录, 遍历时直接剪枝
+DEFAULT_EXCLUDES = [
+    '.git', '.hvigor', '.idea', '.preview', '.cxx',
+    'build', 'oh_modules', 'node_modules',
+]
+
+
+def glob_to_regex(pattern):
+    """把 gitignore 风格的 glob 转成正则: * 不跨目录, ** 可跨任意层目录。"""
+    i, n = 0, len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif c == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif c == '?':
+            parts.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                parts.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j + 1
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return re.compile(''.join(parts) + r'\Z')
+
+
+class IgnoreRule:
+    def __init__(self, base, line, prefix=''):
+        # base 为 .gitignore 所在目录相对遍历根的路径, 根目录为空串;
+        # 遍历根之上的 .gitignore 用 prefix 记录遍历根相对它的路径
+        self.base = base
+        self.prefix = prefix
+        self.negate = line.startswith('!')
+        if self.negate:
+            line = line[1:]
+        self.dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        # 中间含 / 的模式相对 .gitignore 所在目录, 否则匹配任意层级的名称
+        self.anchored = '/' in line
+        self.regex = glob_to_regex(line.lstrip('/'))
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + '/'):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        rel_path = self.prefix + rel_path
+        if self.anchored:
+            return bool(self.regex.match(rel_path))
+        return bool(self.regex.match(rel_path.rsplit('/', 1)[-1]))
+
+
+class PathFilter:
+    """遍历源码树时的过滤器: include/exclude glob 与 .gitignore 规则。
+
+    被排除的目录在进入之前就被剪枝; 路径均为相对遍历根、以 / 分隔。
+    """
+
+    def __init__(self, includes=None, excludes=None, use_gitignore=True):
+        self.includes = [glob_to_regex(pattern) for pattern in includes or []]
+        self.excludes = [glob_to_regex(pattern) for pattern in excludes or []]
+        self.use_gitignore = use_gitignore
+        self.ignore_rules = []
+
+    def load_gitignore(self, dir_path, base='', prefix=''):
+        if not self.use_gitignore:
+            return
+        try:
+            with open(os.path.join(dir_path, '.gitignore'), 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                self.ignore_rules.append(IgnoreRule(base, line, prefix))
+
+    def load_parent_gitignores(self, root):
+        # 遍历根之上直到仓库根目录的 .gitignore 同样生效, 由外到内加载以保证内层规则优先
+        if not self.use_gitignore:
+            return
+        root = os.path.abspath(root)
+        parents = []
+        current = root
+        while not os.path.exists(os.path.join(current, '.git')):
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+            parents.append(current)
+        for parent in reversed(parents):
+            self.load_gitignore(parent, prefix=os.path.relpath(root, parent).replace(os.sep, '/') + '/')
+
+    def _glob_match(self, patterns, rel_path):
+        name = rel_path.rsplit('/', 1)[-1]
+        return any(regex.match(rel_path) or regex.match(name) for regex in patterns)
+
+    def excluded(self, rel_path, is_dir=False):
+        if self._glob_match(self.excludes, rel_path):
+            return True
+        ignored = False
+        for rule in self.ignore_rules:
+            if rule.matches(rel_path, is_dir):
+                ignored = not rule.negate
+        if ignored:
+            return True
+        if not is_dir and self.includes:
+            return not self._glob_match(self.includes, rel_path)
+        return False
+
+    def allowed(self, rel_path, is_dir=False):
+        # 路径本身及其所有上级目录都未被排除
+        parts = rel_path.split('/')
+        for i in range(1, len(parts)):
+            if self.excluded('/'.join(parts[:i]), True):
+                return False
+        return not self.excluded(rel_path, is_dir)
+
+    def scan(self, root, rel_dir, recursive=False):
+        """只遍历 root 下的 rel_dir, 产出与 walk 相同的三元组。
+
+        沿用上次 walk 加载的 .gitignore 规则, 不重新加载; 供监视模式局部刷新使用。
+        """
+        top = os.path.join(root, *rel_dir.split('/')) if rel_dir else root
+        if (rel_dir and not self.allowed(rel_dir, True)) or not os.path.isdir(top):
+            return
+        for current, dirs, files in os.walk(top):
+            rel = os.path.relpath(current, root).replace(os.sep, '/')
+            prefix = '' if rel == '.' else rel + '/'
+            dirs[:] = sorted(d for d in dirs if recursive and not self.excluded(prefix + d, True))
+            files = sorted(f for f in files if not self.excluded(prefix + f))
+            yield current, dirs, files
+
+    def walk(self, root):
+        """同 os.walk, 但按名称排序并剪掉被排除的目录和文件。"""
+        self.ignore_rules = []
+        self.load_parent_gitignores(root)
+        for current, dirs, files in os.walk(root):
+            rel_dir = os.path.relpath(current, root).replace(os.sep, '/')
+            rel_dir = '' if rel_dir == '.' else rel_dir
+            self.load_gitignore(current, rel_dir)
+            prefix = rel_dir + '/' if rel_dir else ''
+            dirs[:] = sorted(d for d in dirs if not self.excluded(prefix + d, True))
+            files = sorted(f for f in files if not self.excluded(prefix + f))
+            yield current, dirs, files
+
+
+def is_binary(head):
+    """根据文件开头的字节判断是否为二进制: 含 NUL 或不是合法 UTF-8 即视为二进制。"""
+    if b'\0' in head:
+        return True
+    try:
+        # 开头片段可能截断多字节字符, 用增量解码器容忍结尾不完整
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def is_binary_file(file_path):
+    with open(file_path, 'rb') as f:
+        return is_binary(f.read(SNIFF_SIZE))
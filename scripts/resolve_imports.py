@@ -0,0 +1,160 @@
+import argparse
+import os
+import re
+
+from import_fixer import import_header_end
+
+# 模块文件扩展名, .d.ts 需先于 .ts 匹配
+MODULE_EXTENSIONS = ('.d.ts', '.ets', '.ts')
+
+# 头部中的模块路径: from '...' 以及 import '...'
+SPECIFIER_PATTERN = re.compile(r'''(\b(?:from|import)\s*)(["'])([^'"\n]*)(["'])''')
+
+base_path = "entry/src/main/ets"
+
+
+def module_stem(file_name):
+    for ext in MODULE_EXTENSIONS:
+        if file_name.endswith(ext):
+            return file_name[:-len(ext)]
+    return None
+
+
+def build_index(base_path):
+    """遍历一次源码树, 返回 (模块名 -> 模块路径列表, 模块路径 -> 文件路径)。
+
+    路径均相对 base_path、使用 / 分隔, 模块路径不带扩展名; index 文件同时登记其目录。
+    """
+    index = {}
+    modules = {}
+    for root, dirs, files in os.walk(base_path):
+        dirs.sort()
+        for file in sorted(files):
+            stem = module_stem(file)
+            if stem is None:
+                continue
+            rel_dir = os.path.relpath(root, base_path).replace(os.sep, '/')
+            module = stem if rel_dir == '.' else f'{rel_dir}/{stem}'
+            rel_file = file if rel_dir == '.' else f'{rel_dir}/{file}'
+            modules.setdefault(module, rel_file)
+            if stem == 'index':
+                modules.setdefault(rel_dir, rel_file)
+            elif module not in index.get(stem, []):
+                index.setdefault(stem, []).append(module)
+    return index, modules
+
+
+def relative_specifier(from_dir, module):
+    spec = os.path.relpath(module, from_dir or '.').replace(os.sep, '/')
+    return spec if spec.startswith('.') else './' + spec
+
+
+def module_path(spec, from_dir):
+    return os.path.normpath(os.path.join(from_dir, spec)).replace(os.sep, '/')
+
+
+def resolve(spec, from_dir, index):
+    """为失效的路径查找新位置, 返回 (新路径, 候选模块列表); 无法唯一确定时新路径为 None。"""
+    parts = [part for part in spec.split('/') if part not in ('.', '..', '')]
+    if not parts:
+        return None, []
+    candidates = index.get(parts[-1], [])
+    if len(candidates) > 1:
+        # 同名模块用原路径末尾的目录名消歧, 例如 parsers/CssParser
+        suffix = '/'.join(parts)
+        narrowed = [module for module in candidates if ('/' + module).endswith('/' + suffix)]
+        if len(narrowed) == 1:
+            candidates = narrowed
+    if len(candidates) == 1:
+        return relative_specifier(from_dir, candidates[0]), candidates
+    return None, candidates
+
+
+def resolve_file(file_path, index, modules, dry_run=False):
+    # 返回 (改写列表, 无法解析列表, 歧义列表)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    end = import_header_end(data)
+    header = data[:end].decode('utf-8')
+    from_dir = os.path.relpath(os.path.dirname(file_path), base_path).replace(os.sep, '/')
+    if from_dir == '.':
+        from_dir = ''
+
+    rewrites, unresolved, ambiguous = [], [], []
+
+    def replace(match):
+        prefix, quote, spec, _ = match.groups()
+        if not spec.startswith('.'):
+            return match.group()
+        if module_path(spec, from_dir) in modules:
+            return match.group()
+        new_spec, candidates = resolve(spec, from_dir, index)
+        if new_spec:
+            rewrites.append((spec, new_spec))
+            return f'{prefix}{quote}{new_spec}{quote}'
+        if candidates:
+            ambiguous.append((spec, candidates))
+        else:
+            unresolved.append(spec)
+        return match.group()
+
+    fixed_header = SPECIFIER_PATTERN.sub(replace, header)
+    if fixed_header != header and not dry_run:
+        with open(file_path, 'wb') as f:
+            f.write(fixed_header.encode('utf-8'))
+            f.write(memoryview(data)[end:])
+    return rewrites, unresolved, ambiguous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="根据源码树索引修复失效的相对导入路径")
+    parser.add_argument('--dry-run', action='store_true', help='只输出报告, 不写回文件')
+    args = parser.parse_args()
+
+    index, modules = build_index(base_path)
+
+    fixed_files = []
+    unresolved_imports = []
+    ambiguous_imports = []
+    for root, dirs, files in os.walk(base_path):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.endswith('.ets'):
+                continue
+            file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(file_path, base_path)
+            try:
+                rewrites, unresolved, ambiguous = resolve_file(file_path, index, modules, args.dry_run)
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                continue
+            if rewrites:
+                fixed_files.append((rel_path, rewrites))
+            unresolved_imports.extend((rel_path, spec) for spec in unresolved)
+            ambiguous_imports.extend((rel_path, spec, candidates) for spec, candidates in ambiguous)
+
+    print(f"\n{'将修复' if args.dry_run else '总共修复了'} {len(fixed_files)} 个文件")
+    for rel_path, rewrites in fixed_files:
+        print(f"  - {rel_path}")
+        for old, new in rewrites:
+            print(f"      {old} -> {new}")
+
+    if unresolved_imports:
+        print(f"\n无法解析的导入 ({len(unresolved_imports)}):")
+        for rel_path, spec in unresolved_imports:
+            print(f"  - {rel_path}: {spec}")
+
+    if ambiguous_imports:
+        print(f"\n存在歧义的导入 ({len(ambiguous_imports)}):")
+        for rel_path, spec, candidates in ambiguous_imports:
+            print(f"  - {rel_path}: {spec} -> {', '.join(candidates)}")
+
+    duplicates = {name: paths for name, paths in index.items() if len(paths) > 1}
+    if duplicates:
+        print(f"\n同名模块 ({len(duplicates)}):")
+        for name in sorted(duplicates):
+            print(f"  - {name}: {', '.join(duplicates[name])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from array import array
+
+# 组件树中的节点行: "<缩进>|-> Text childSize:0"
+NODE_LINE = re.compile(r'^( *)\|-> (.+?) childSize:(-?\d+)\s*$')
+# 节点字段行: "<缩进>| key: value", 父节点的最后一个子树中没有竖线
+FIELD_LINE = re.compile(r'^ *(?:\| ?)?([A-Za-z][\w ]*?):(?: (.*)|)$')
+# 窗口信息行: "WindowRect: [ 0, 0, 1320, 2856 ]", 部分字段冒号后没有空格
+HEADER_LINE = re.compile(r'^ *([A-Za-z][\w ]*?):\s*(.*?)\s*$')
+SECTION_LINE = re.compile(r'^-{3,}\[?([^\]-]+?)\]?-{3,}\s*$')
+
+GEOMETRY = ('top', 'left', 'width', 'height')
+FLAGS = ('visible', 'clickable', 'longclickable', 'checkable', 'scrollable', 'checked')
+# 这些字段取默认值时不单独保存
+FIELD_DEFAULTS = {
+    'compid': '', 'text': '', 'accessibilityText': '', 'accessibilityGroup': '0',
+    'accessibilityLevel': 'auto', 'accessibilityCustomRole': '', 'hint': '', 'childTree': '-1',
+}
+NODE_FIELDS = {'ID'} | set(GEOMETRY) | set(FLAGS) | set(FIELD_DEFAULTS)
+
+CSV_COLUMNS = ['index', 'parent', 'depth', 'type', 'id', *GEOMETRY, *FLAGS, 'child_size', 'text', 'compid']
+
+
+def parse_rect(value):
+    """解析 "[ 0, 0, 1320, 2856 ]" 形式的数值列表, 无法解析时返回 None。"""
+    try:
+        return [float(part) for part in value.strip('[] ').split(',') if part.strip()]
+    except ValueError:
+        return None
+
+
+class UITree:
+    """一个窗口的组件树, 以并行数组保存: 节点按先序编号, 内存只与节点数有关。
+
+    每个节点的子树是编号连续的区间 [i, end[i]), 因此不需要保存子节点列表。
+    文本、compid 等大多为空的字段放在按节点编号索引的稀疏字典中。
+    """
+
+    def __init__(self, page=None):
+        self.page = page
+        self.header = {}
+        self.type_names = []
+        self._type_ids = {}
+        self.types = array('H')
+        self.ids = array('q')
+        self.parents = array('l')
+        self.depths = array('H')
+        self.child_sizes = array('l')
+        self.top = array('d')
+        self.left = array('d')
+        self.width = array('d')
+        self.height = array('d')
+        self.flags = array('B')
+        self.end = array('l')
+        self.texts = {}
+        self.extras = {}
+
+    def __len__(self):
+        return len(self.types)
+
+    @property
+    def name(self):
+        return self.page or self.header.get('WindowName', '')
+
+    def window_rect(self):
+        """窗口区域 (left, top, width, height), 没有记录时返回 None。"""
+        rect = parse_rect(self.header.get('WindowRect', ''))
+        return tuple(rect) if rect and len(rect) == 4 else None
+
+    def add_node(self, type_name, depth, parent, child_size):
+        type_id = self._type_ids.get(type_name)
+        if type_id is None:
+            type_id = self._type_ids[type_name] = len(self.type_names)
+            self.type_names.append(type_name)
+        self.types.append(type_id)
+        self.ids.append(-1)
+        self.parents.append(parent)
+        self.depths.append(depth)
+        self.child_sizes.append(child_size)
+        for column in (self.top, self.left, self.width, self.height):
+            column.append(0.0)
+        self.flags.append(0)
+        self.end.append(0)
+        return len(self.types) - 1
+
+    def set_field(self, node, key, value):
+        if key == 'ID':
+            self.ids[node] = int(value) if value.lstrip('-').isdigit() else -1
+        elif key in GEOMETRY:
+            try:
+                getattr(self, key)[node] = float(value)
+            except ValueError:
+                pass
+        elif key in FLAGS:
+            bit = 1 << FLAGS.index(key)
+            if value.strip() == '1':
+                self.flags[node] |= bit
+            else:
+                self.flags[node] &= ~bit
+        elif key == 'text':
+            if value:
+                self.texts[node] = value
+        elif value != FIELD_DEFAULTS.get(key, ''):
+            self.extras.setdefault(node, {})[key] = value
+
+    def append_text(self, node, line):
+        # 多行文本的后续行
+        self.texts[node] = self.texts.get(node, '') + '\n' + line
+
+    def finish(self):
+        """解析结束后计算每个子树的结束位置。"""
+        stack = []
+        for node in range(len(self)):
+            while stack and self.depths[stack[-1]] >= self.depths[node]:
+                self.end[stack.pop()] = node
+            stack.append(node)
+        for node in stack:
+            self.end[node] = len(self)
+
+    def type_name(self, node):
+        return self.type_names[self.types[node]]
+
+    def flag(self, node, name):
+        return bool(self.flags[node] & (1 << FLAGS.index(name)))
+
+    def rect(self, node):
+        return self.left[node], self.top[node], self.width[node], self.height[node]
+
+    def children(self, node):
+        child = node + 1
+        while child < self.end[node]:
+            yield child
+            child = self.end[child]
+
+    def subtree_size(self, node):
+        return self.end[node] - node
+
+    def node(self, node):
+        """单个节点的全部字段, 用于导出。"""
+        data = {
+            'index': node,
+            'parent': self.parents[node],
+            'depth': self.depths[node],
+            'type': self.type_name(node),
+            'id': self.ids[node],
+            'top': self.top[node],
+            'left': self.left[node],
+            'width': self.width[node],
+            'height': self.height[node],
+        }
+        for name in FLAGS:
+            data[name] = int(self.flag(node, name))
+        data['child_size'] = self.child_sizes[node]
+        data['text'] = self.texts.get(node, '')
+        data['compid'] = self.extras.get(node, {}).get('compid', '')
+        data.update((key, value) for key, value in self.extras.get(node, {}).items() if key != 'compid')
+        return data
+
+
+def iter_trees(lines, page=None):
+    """逐行解析 hidumper 输出, 每遇到一个窗口 (WindowName) 产出一棵 UITree。
+
+    只保留当前窗口的数据, 不把整个文件读入内存。
+    """
+    tree = None
+    stack = []
+    node = -1
+    last_key = None
+    root_indent = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+        if line[0] == '-' and SECTION_LINE.match(line):
+            continue
+
+        match = NODE_LINE.match(line) if '|->' in line else None
+        if match and tree is not None:
+            indent = len(match.group(1))
+            if root_indent is None:
+                root_indent = indent
+            depth = max((indent - root_indent) // 2, 0)
+            while len(stack) > depth:
+                stack.pop()
+            parent = stack[-1] if stack else -1
+            node = tree.add_node(match.group(2), depth, parent, int(match.group(3)))
+            stack.append(node)
+            last_key = None
+            continue
+
+        indent = len(line) - len(line.lstrip(' '))
+        if node >= 0 and indent >= 2:
+            match = FIELD_LINE.match(line)
+            if match and match.group(1) in NODE_FIELDS:
+                last_key = match.group(1)
+                tree.set_field(node, last_key, match.group(2) or '')
+            elif last_key == 'text':
+                tree.append_text(node, line.lstrip(' |'))
+            continue
+
+        match = HEADER_LINE.match(line)
+        if not match:
+            continue
+        key, value = match.group(1).strip(), match.group(2)
+        if key == 'WindowName':
+            if tree is not None:
+                tree.finish()
+                yield tree
+            tree = UITree(page)
+            stack = []
+            node = -1
+            root_indent = None
+        if tree is not None:
+            tree.header.setdefault(key, value)
+    if tree is not None:
+        tree.finish()
+        yield tree
+
+
+def load_dump(path, page=None):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return list(iter_trees(f, page))
+
+
+def max_depth(tree):
+    return max(tree.depths, default=-1) + 1
+
+
+def write_json(trees, out):
+    data = []
+    for tree in trees:
+        data.append({
+            'page': tree.page,
+            'window': tree.header,
+            'nodes': [tree.node(node) for node in range(len(tree))],
+        })
+    json.dump(data if len(data) != 1 else data[0], out, ensure_ascii=False, indent=1)
+    out.write('\n')
+
+
+def write_csv(trees, out):
+    writer = csv.writer(out)
+    writer.writerow(['window', *CSV_COLUMNS])
+    for tree in trees:
+        for node in range(len(tree)):
+            data = tree.node(node)
+            writer.writerow([tree.name, *(data[column] for column in CSV_COLUMNS)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析 hidumper 导出的组件树 (如 simple_dump_AstroRead_*.txt)")
+    parser.add_argument('dump', help='hidumper 输出文件')
+    parser.add_argument('--page', help='页面名称, 记录在导出结果中 (默认: 窗口名)')
+    parser.add_argument('--format', choices=('json', 'csv'), help='导出格式; 省略时只输出摘要')
+    parser.add_argument('-o', '--output', help='导出文件路径 (默认: 标准输出)')
+    args = parser.parse_args()
+
+    trees = load_dump(args.dump, args.page)
+    if not trees:
+        print(f"没有找到窗口信息: {args.dump}")
+        sys.exit(1)
+
+    if not args.format:
+        for tree in trees:
+            types = sorted(((tree.types.count(i), name) for i, name in enumerate(tree.type_names)), reverse=True)
+            print(f"窗口 {tree.name}: {len(tree)} 个节点, 最大深度 {max_depth(tree)}, WindowRect {tree.header.get('WindowRect', '?')}")
+            print("  " + ", ".join(f"{name} {count}" for count, name in types))
+        return
+
+    writer = write_json if args.format == 'json' else write_csv
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8', newline='' if args.format == 'csv' else None) as f:
+            writer(trees, f)
+        print(f"已导出 {sum(len(tree) for tree in trees)} 个节点: {args.output}")
+    else:
+        writer(trees, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
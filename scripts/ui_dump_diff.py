@@ -0,0 +1,274 @@
+import argparse
+import json
+import re
+import sys
+
+from ui_dump import load_dump
+from ui_layout_cost import analyze
+
+# 比较的指标: 名称 -> 说明
+METRICS = {
+    'nodes': '节点数',
+    'max_depth': '最大深度',
+    'avg_depth': '平均深度',
+    'invisible_nodes': 'visible 为 0 的节点',
+    'hidden_nodes': 'visible 但看不到的节点',
+    'wrapper_nodes': '包装节点',
+    'oversized_scrolls': '渲染条目过多的滚动容器',
+    'finish_count': 'finishCount 条目数',
+}
+# 窗口与 vsync 相关的头部字段, 原样列出变化
+WINDOW_FIELDS = ('WindowRect', 'LastRequestVsyncTime', 'last vsyncId', 'transactionFlags', 'finishCount')
+# 尺寸或相对父节点的位置变化超过该值 (像素) 的匹配节点视为移动
+GEOMETRY_TOLERANCE = 1.0
+# 同类兄弟节点超过该数量时按顺序配对, 不再两两比较几何距离
+PAIRWISE_LIMIT = 50
+LIST_LIMIT = 10
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def count_entries(value):
+    # finishCount:[ 1, 2 ] 这类列表字段的条目数
+    return len(_NUMBER.findall(value or ''))
+
+
+def metrics(tree):
+    report = analyze(tree)
+    return {
+        'nodes': report['nodes'],
+        'max_depth': report['max_depth'],
+        'avg_depth': report['avg_depth'],
+        'invisible_nodes': sum(1 for node in range(len(tree)) if not tree.flag(node, 'visible')),
+        'hidden_nodes': report['hidden_nodes'],
+        'wrapper_nodes': report['wrapper_nodes'],
+        'oversized_scrolls': sum(1 for entry in report['scroll_containers'] if entry['oversized']),
+        'finish_count': count_entries(tree.header.get('finishCount')),
+    }
+
+
+def distance(old, a, new, b):
+    return sum(abs(x - y) for x, y in zip(old.rect(a), new.rect(b)))
+
+
+def match_children(old, a, new, b):
+    """把 a 与 b 的子节点按类型分组后配对, 同类中按几何距离从近到远贪心配对。
+
+    返回 (配对列表, 未配对的旧子节点, 未配对的新子节点)。
+    """
+    old_by_type, new_by_type = {}, {}
+    for child in old.children(a):
+        old_by_type.setdefault(old.type_name(child), []).append(child)
+    for child in new.children(b):
+        new_by_type.setdefault(new.type_name(child), []).append(child)
+
+    pairs, removed, added = [], [], []
+    for type_name in old_by_type.keys() | new_by_type.keys():
+        olds, news = old_by_type.get(type_name, []), new_by_type.get(type_name, [])
+        if len(olds) * len(news) > PAIRWISE_LIMIT * PAIRWISE_LIMIT:
+            # 长列表按顺序配对
+            count = min(len(olds), len(news))
+            pairs.extend(zip(olds[:count], news[:count]))
+            removed.extend(olds[count:])
+            added.extend(news[count:])
+            continue
+        candidates = sorted((distance(old, x, new, y), i, j) for i, x in enumerate(olds) for j, y in enumerate(news))
+        used_old, used_new = set(), set()
+        for _, i, j in candidates:
+            if i in used_old or j in used_new:
+                continue
+            used_old.add(i)
+            used_new.add(j)
+            pairs.append((olds[i], news[j]))
+        removed.extend(x for i, x in enumerate(olds) if i not in used_old)
+        added.extend(y for j, y in enumerate(news) if j not in used_new)
+    return sorted(pairs), sorted(removed), sorted(added)
+
+
+def type_path(tree, node):
+    path = []
+    while node >= 0:
+        path.append(tree.type_name(node))
+        node = tree.parents[node]
+    return '/'.join(reversed(path))
+
+
+def describe(tree, node):
+    return {'id': tree.ids[node], 'type': tree.type_name(node), 'path': type_path(tree, node),
+            'nodes': tree.subtree_size(node)}
+
+
+def shifted(old, a, new, b):
+    # 尺寸变化, 或相对父节点的位置变化; 随父节点整体平移的子节点不算
+    old_rect, new_rect = old.rect(a), new.rect(b)
+    if abs(old_rect[2] - new_rect[2]) + abs(old_rect[3] - new_rect[3]) > GEOMETRY_TOLERANCE:
+        return True
+    old_parent, new_parent = old.parents[a], new.parents[b]
+    dx = old_rect[0] - new_rect[0] - (old.left[old_parent] - new.left[new_parent] if old_parent >= 0 else 0)
+    dy = old_rect[1] - new_rect[1] - (old.top[old_parent] - new.top[new_parent] if old_parent >= 0 else 0)
+    return abs(dx) + abs(dy) > GEOMETRY_TOLERANCE
+
+
+def match_trees(old, new):
+    """从根节点开始逐层配对, 返回 (新增子树, 删除子树, 位置或尺寸变化的节点)。
+
+    只有父节点已配对、类型相同的节点才会配对, 因此配对的节点类型路径一定相同。
+    """
+    added, removed, moved = [], [], []
+    if not len(old) or not len(new):
+        return ([describe(new, 0)] if len(new) else []), ([describe(old, 0)] if len(old) else []), moved
+    if old.type_name(0) != new.type_name(0):
+        return [describe(new, 0)], [describe(old, 0)], moved
+
+    queue = [(0, 0)]
+    while queue:
+        a, b = queue.pop()
+        if shifted(old, a, new, b):
+            moved.append(dict(describe(new, b), old_rect=list(old.rect(a)), new_rect=list(new.rect(b))))
+        pairs, old_rest, new_rest = match_children(old, a, new, b)
+        queue.extend(pairs)
+        removed.extend(describe(old, node) for node in old_rest)
+        added.extend(describe(new, node) for node in new_rest)
+    for entries in (added, removed):
+        entries.sort(key=lambda entry: (-entry['nodes'], entry['path']))
+    moved.sort(key=lambda entry: entry['path'])
+    return added, removed, moved
+
+
+def load_budgets(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_budget(budget, old_metrics, new_metrics):
+    """按预算检查新捕获的指标, 返回超出预算的说明列表。
+
+    预算中 <指标> 为新值上限, <指标>_growth 为增量上限, <指标>_growth_pct 为增长百分比上限。
+    """
+    violations = []
+    for key, limit in budget.items():
+        if key in new_metrics:
+            value = new_metrics[key]
+            label = f"{key} = {value}"
+        elif key.endswith('_growth_pct') and key[:-len('_growth_pct')] in new_metrics:
+            name = key[:-len('_growth_pct')]
+            base = old_metrics[name]
+            value = (new_metrics[name] - base) * 100 / base if base else 0
+            label = f"{name} 增长 {value:.1f}%"
+        elif key.endswith('_growth') and key[:-len('_growth')] in new_metrics:
+            name = key[:-len('_growth')]
+            value = new_metrics[name] - old_metrics[name]
+            label = f"{name} 增加 {value:+g}"
+        else:
+            violations.append(f"未知的预算项: {key}")
+            continue
+        if value > limit:
+            violations.append(f"{label}, 超出预算 {limit}")
+    return violations
+
+
+def page_budget(budgets, page):
+    # "*" 中的预算适用于所有页面, 页面自己的预算覆盖同名项
+    budget = dict(budgets.get('*', {}))
+    budget.update(budgets.get(page, {}))
+    return budget
+
+
+def pair_trees(old_trees, new_trees):
+    # 按窗口名 (或 --page 给出的页面名) 配对, 只有一个窗口时直接配对
+    if len(old_trees) == 1 and len(new_trees) == 1:
+        return [(old_trees[0], new_trees[0])]
+    new_by_name = {tree.name: tree for tree in new_trees}
+    return [(tree, new_by_name[tree.name]) for tree in old_trees if tree.name in new_by_name]
+
+
+def compare(old, new, budgets=None):
+    old_metrics, new_metrics = metrics(old), metrics(new)
+    added, removed, moved = match_trees(old, new)
+    budget = page_budget(budgets, new.name) if budgets is not None else {}
+    return {
+        'page': new.name,
+        'metrics': {key: {'old': old_metrics[key], 'new': new_metrics[key]} for key in METRICS},
+        'window': {key: {'old': old.header.get(key), 'new': new.header.get(key)}
+                   for key in WINDOW_FIELDS if key in old.header or key in new.header},
+        'added': added,
+        'removed': removed,
+        'moved': moved,
+        'budget': budget,
+        'violations': check_budget(budget, old_metrics, new_metrics),
+    }
+
+
+def format_delta(old, new):
+    delta = new - old
+    if not delta:
+        return '0'
+    pct = f" ({delta * 100 / old:+.1f}%)" if old else ''
+    return f"{delta:+g}{pct}"
+
+
+def print_report(result):
+    print(f"\n{'=' * 60}\n页面 {result['page']}\n{'=' * 60}")
+    print(f"{'指标':<24}{'旧':>10}{'新':>10}  变化")
+    for key, label in METRICS.items():
+        values = result['metrics'][key]
+        print(f"{label:<24}{values['old']:>10g}{values['new']:>10g}  {format_delta(values['old'], values['new'])}")
+
+    changed = {key: values for key, values in result['window'].items() if values['old'] != values['new']}
+    print(f"\n窗口字段: {len(changed)} 项变化")
+    for key, values in changed.items():
+        old_value, new_value = values['old'], values['new']
+        delta = ''
+        if old_value and new_value and _NUMBER.fullmatch(old_value) and _NUMBER.fullmatch(new_value):
+            number = float if '.' in old_value + new_value else int
+            delta = f" ({number(new_value) - number(old_value):+})"
+        print(f"  {key}: {old_value} -> {new_value}{delta}")
+
+    for title, key in (('新增子树', 'added'), ('删除子树', 'removed')):
+        entries = result[key]
+        print(f"\n{title}: {len(entries)} 个, 共 {sum(entry['nodes'] for entry in entries)} 个节点")
+        for entry in entries[:LIST_LIMIT]:
+            print(f"  {entry['type']}#{entry['id']} ({entry['nodes']} 个节点): {entry['path']}")
+    print(f"\n位置或尺寸变化的节点: {len(result['moved'])} 个")
+    for entry in result['moved'][:LIST_LIMIT]:
+        print(f"  {entry['type']}#{entry['id']}: {entry['old_rect']} -> {entry['new_rect']}")
+
+    if result['budget']:
+        if result['violations']:
+            print("\n超出预算:")
+            for violation in result['violations']:
+                print(f"  {violation}")
+        else:
+            print("\n预算检查通过")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较同一页面的两次 hidumper 捕获, 并按预算检查组件树规模")
+    parser.add_argument('old', help='基准捕获')
+    parser.add_argument('new', help='新的捕获')
+    parser.add_argument('--page', help='页面名称, 用于匹配预算 (默认: 窗口名)')
+    parser.add_argument('--budget', metavar='PATH',
+                        help='预算文件 (JSON: {页面名或 "*": {指标: 上限, 指标_growth: 增量上限, 指标_growth_pct: 百分比上限}})')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出比较结果')
+    args = parser.parse_args()
+
+    old_trees = load_dump(args.old, args.page)
+    new_trees = load_dump(args.new, args.page)
+    pairs = pair_trees(old_trees, new_trees)
+    if not pairs:
+        print("两次捕获中没有可以对应的窗口", file=sys.stderr)
+        sys.exit(2)
+    budgets = load_budgets(args.budget) if args.budget else None
+
+    results = [compare(old, new, budgets) for old, new in pairs]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for result in results:
+            print_report(result)
+    if any(result['violations'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
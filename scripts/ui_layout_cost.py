@@ -0,0 +1,244 @@
+import argparse
+import json
+import sys
+
+from ui_dump import load_dump
+
+# 单子节点容器连续嵌套达到该长度时报告为包装链
+MIN_CHAIN = 2
+# 子节点会相互叠放的容器, 只在其中检查被后面的兄弟节点完全遮挡的节点
+OVERLAY_TYPES = {'root', 'Stack', 'RelativeContainer'}
+# 滚动容器: 渲染的条目数超过视口内条目数的 OVERSCAN 倍且多出 MIN_EXCESS 个以上时报告
+SCROLL_TYPES = {'Scroll', 'List', 'Grid', 'WaterFlow'}
+OVERSCAN = 3
+MIN_EXCESS = 10
+# 子树成本: 每个节点 1, 包装链中的节点和不可见却仍在渲染的节点各加 1
+WRAPPER_COST = 1
+HIDDEN_COST = 1
+# 某个子节点占父节点子树成本的比例超过该值时, 父节点不单独列入排名
+DOMINANT_SHARE = 0.8
+TOP = 10
+# 文本报告中每类节点最多列出的数量, 完整列表见 --json
+LIST_LIMIT = 20
+
+
+def intersects(a, b):
+    # 矩形为 (left, top, width, height)
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def contains(outer, inner):
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2] and inner[1] + inner[3] <= outer[1] + outer[3])
+
+
+def intersection(a, b):
+    left, top = max(a[0], b[0]), max(a[1], b[1])
+    right, bottom = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    return left, top, max(right - left, 0), max(bottom - top, 0)
+
+
+def has_area(rect):
+    return rect[2] > 0 and rect[3] > 0
+
+
+def describe(tree, node):
+    return {'id': tree.ids[node], 'type': tree.type_name(node), 'index': node}
+
+
+def wrapper_chains(tree, min_chain=MIN_CHAIN):
+    """连续嵌套的单子节点容器, 返回 [节点链], 每条链从最外层开始。"""
+    chains = []
+    # 只有一个子节点: 第一个子节点的子树一直延伸到父节点子树的末尾
+    single = [tree.subtree_size(node) > 1 and tree.end[node + 1] == tree.end[node] for node in range(len(tree))]
+    for node in range(len(tree)):
+        if not single[node] or (tree.parents[node] >= 0 and single[tree.parents[node]]):
+            continue
+        chain = [node]
+        while single[chain[-1]]:
+            chain.append(chain[-1] + 1)
+        # 链的最后一个节点有多个子节点或是叶子, 它本身不是包装
+        chain.pop()
+        if len(chain) >= min_chain:
+            chains.append(chain)
+    return chains
+
+
+def hidden_nodes(tree, window):
+    """visible 为 1 却不会被看到的节点: 完全在窗口外、面积为 0、或被后面的兄弟节点完全遮挡。"""
+    offscreen, zero_area, covered = [], [], []
+    for node in range(len(tree)):
+        if not tree.flag(node, 'visible'):
+            continue
+        rect = tree.rect(node)
+        if not has_area(rect):
+            zero_area.append(node)
+        elif window and not intersects(rect, window):
+            offscreen.append(node)
+
+    for parent in range(len(tree)):
+        if tree.type_name(parent) not in OVERLAY_TYPES:
+            continue
+        children = [child for child in tree.children(parent)
+                    if tree.flag(child, 'visible') and has_area(tree.rect(child))]
+        for i, child in enumerate(children):
+            cover = next((sibling for sibling in children[i + 1:]
+                          if contains(tree.rect(sibling), tree.rect(child))), None)
+            if cover is not None:
+                covered.append((child, cover))
+    return offscreen, zero_area, covered
+
+
+def scroll_items(tree, container):
+    # 跳过单子节点的包装 (如 Scroll > Column), 取真正的条目列表
+    node = container
+    children = list(tree.children(node))
+    while len(children) == 1:
+        node = children[0]
+        children = list(tree.children(node))
+    return children
+
+
+def oversized_scrolls(tree, window):
+    """渲染条目远多于视口能显示的条目的滚动容器, 通常意味着没有使用 LazyForEach。"""
+    results = []
+    for node in range(len(tree)):
+        if tree.type_name(node) not in SCROLL_TYPES:
+            continue
+        viewport = tree.rect(node)
+        if window:
+            viewport = intersection(viewport, window)
+        items = scroll_items(tree, node)
+        in_view = sum(1 for item in items if has_area(viewport) and intersects(tree.rect(item), viewport))
+        offscreen = sum(1 for child in range(node + 1, tree.end[node])
+                        if not has_area(viewport) or not intersects(tree.rect(child), viewport))
+        entry = dict(describe(tree, node), items=len(items), in_view=in_view,
+                     subtree=tree.subtree_size(node), offscreen_nodes=offscreen)
+        entry['oversized'] = len(items) > OVERSCAN * max(in_view, 1) and len(items) - in_view >= MIN_EXCESS
+        results.append(entry)
+    return results
+
+
+def subtree_costs(tree, wrappers, hidden):
+    """返回 (每个子树的成本, 每个子树的层数)。"""
+    cost = [1 + (WRAPPER_COST if node in wrappers else 0) + (HIDDEN_COST if node in hidden else 0)
+            for node in range(len(tree))]
+    height = [1] * len(tree)
+    # 先序编号中子节点总在父节点之后, 倒序累加即可
+    for node in range(len(tree) - 1, 0, -1):
+        parent = tree.parents[node]
+        if parent >= 0:
+            cost[parent] += cost[node]
+            height[parent] = max(height[parent], height[node] + 1)
+    return cost, height
+
+
+def rank_subtrees(tree, cost, height, top=TOP):
+    """按子树成本排名; 成本几乎全部来自某一个子节点的祖先只是包装, 不单独列出。"""
+    ranked = []
+    for node in range(len(tree)):
+        children = list(tree.children(node))
+        if not children:
+            continue
+        heaviest = max(cost[child] for child in children)
+        if heaviest > DOMINANT_SHARE * cost[node]:
+            continue
+        ranked.append(dict(describe(tree, node), cost=cost[node], nodes=tree.subtree_size(node), depth=height[node]))
+    ranked.sort(key=lambda entry: (-entry['cost'], entry['index']))
+    return ranked[:top]
+
+
+def analyze(tree, top=TOP, min_chain=MIN_CHAIN):
+    window = tree.window_rect()
+    depths = [depth + 1 for depth in tree.depths]
+    leaves = [depths[node] for node in range(len(tree)) if tree.subtree_size(node) == 1]
+    chains = wrapper_chains(tree, min_chain)
+    offscreen, zero_area, covered = hidden_nodes(tree, window)
+    wrappers = {node for chain in chains for node in chain}
+    hidden = set(offscreen) | set(zero_area) | {child for child, _ in covered}
+    cost, height = subtree_costs(tree, wrappers, hidden)
+    return {
+        'page': tree.name,
+        'window': tree.header.get('WindowName', ''),
+        'window_rect': list(window) if window else None,
+        'nodes': len(tree),
+        'max_depth': max(depths, default=0),
+        'avg_depth': round(sum(depths) / len(depths), 2) if depths else 0,
+        'leaf_depth': round(sum(leaves) / len(leaves), 2) if leaves else 0,
+        'wrapper_chains': [[describe(tree, node) for node in chain] for chain in chains],
+        'wrapper_nodes': len(wrappers),
+        'offscreen': [describe(tree, node) for node in offscreen],
+        'zero_area': [describe(tree, node) for node in zero_area],
+        'covered': [dict(describe(tree, child), covered_by=tree.ids[cover]) for child, cover in covered],
+        'hidden_nodes': len(hidden),
+        'scroll_containers': oversized_scrolls(tree, window),
+        'total_cost': cost[0] if cost else 0,
+        'top_subtrees': rank_subtrees(tree, cost, height, top),
+    }
+
+
+def chain_text(chain):
+    return ' > '.join(f"{entry['type']}#{entry['id']}" for entry in chain)
+
+
+def print_report(report):
+    print(f"\n{'=' * 60}\n页面 {report['page']} (窗口 {report['window']}, WindowRect {report['window_rect']})\n{'=' * 60}")
+    print(f"节点数: {report['nodes']}, 最大深度: {report['max_depth']}, "
+          f"平均深度: {report['avg_depth']} (叶子 {report['leaf_depth']}), 总成本: {report['total_cost']}")
+
+    print(f"\n单子节点包装链: {len(report['wrapper_chains'])} 条, 共 {report['wrapper_nodes']} 个包装节点")
+    for chain in sorted(report['wrapper_chains'], key=len, reverse=True):
+        print(f"  [{len(chain)}] {chain_text(chain)}")
+
+    print(f"\nvisible 但看不到的节点: {report['hidden_nodes']} 个")
+    for title, key in (('完全在窗口外', 'offscreen'), ('面积为 0', 'zero_area'), ('被兄弟节点遮挡', 'covered')):
+        entries = report[key]
+        if entries:
+            text = ', '.join(
+                f"{entry['type']}#{entry['id']}" + (f" (被 #{entry['covered_by']} 遮挡)" if 'covered_by' in entry else '')
+                for entry in entries[:LIST_LIMIT])
+            more = f" 等 {len(entries)} 个" if len(entries) > LIST_LIMIT else ''
+            print(f"  {title}: {text}{more}")
+
+    print("\n滚动容器:")
+    for entry in report['scroll_containers']:
+        mark = '  <-- 渲染条目过多, 考虑 LazyForEach' if entry['oversized'] else ''
+        print(f"  {entry['type']}#{entry['id']}: {entry['items']} 个条目, 视口内 {entry['in_view']} 个, "
+              f"子树 {entry['subtree']} 个节点, 视口外 {entry['offscreen_nodes']} 个{mark}")
+    if not report['scroll_containers']:
+        print("  (无)")
+
+    print("\n成本最高的子树:")
+    for entry in report['top_subtrees']:
+        print(f"  {entry['type']}#{entry['id']}: 成本 {entry['cost']}, {entry['nodes']} 个节点, 深度 {entry['depth']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析 hidumper 组件树的渲染成本")
+    parser.add_argument('dumps', nargs='+', help='hidumper 输出文件')
+    parser.add_argument('--page', action='append', default=[],
+                        help='页面名称, 按顺序对应各个输出文件, 可重复指定')
+    parser.add_argument('--top', type=int, default=TOP, help=f'列出成本最高的子树数量 (默认: {TOP})')
+    parser.add_argument('--min-chain', type=int, default=MIN_CHAIN,
+                        help=f'报告的包装链最短长度 (默认: {MIN_CHAIN})')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出分析结果')
+    args = parser.parse_args()
+
+    reports = []
+    for i, dump in enumerate(args.dumps):
+        page = args.page[i] if i < len(args.page) else None
+        trees = load_dump(dump, page)
+        if not trees:
+            print(f"没有找到窗口信息: {dump}", file=sys.stderr)
+            sys.exit(1)
+        reports.extend(analyze(tree, args.top, args.min_chain) for tree in trees)
+
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+        return
+    for report in reports:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()